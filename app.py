@@ -1,29 +1,24 @@
+import time
+_import_started = time.perf_counter()
+
 import os
+import json
 import logging
-import math
-import random
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import firebase_admin
 from firebase_admin import credentials, firestore
-from utils.resume_utils import (
-    load_models,
-    extract_text_from_pdf,
-    preprocess_text,
-    extract_skills_dynamic,
-    normalize_skill,
-    extract_qualifications,
-    normalize_qualification,
-    extract_experience,
-    parse_required_experience,
-    extract_work_experience_section,
-    extract_work_periods,
-    total_experience_in_months,
-    format_months
-)
-from sklearn.metrics.pairwise import cosine_similarity
-import requests
-from io import BytesIO
+from utils import metrics
+from utils.cache import ranking_cache, cache_stats
+from utils.datastore import RankingStore
+from utils.pipeline import rank_job, RankingError
+from utils.ranking import page_candidates, job_embedding
+from utils.vector_index import get_vector_index
+from utils.jobs import RankJobQueue
+from utils.model_registry import get_inference, LocalInference
+from utils.profiling import SamplingProfiler
+from utils import startup
+from config import Config, ProductionConfig
 
 # Configure logging
 logging.basicConfig(
@@ -32,31 +27,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Refuse to start in production without the settings it requires
+if os.getenv('FLASK_ENV') == 'production':
+    ProductionConfig.validate()
+
 app = Flask(__name__)
 
 # Configure CORS
 allowed_origins = os.getenv('ALLOWED_ORIGINS', 'http://localhost:4000,https://jobscout2025.netlify.app').split(',')
 CORS(app, resources={r"/*": {"origins": allowed_origins}})
 
+startup.record_phase("imports", time.perf_counter() - _import_started)
+
 # Initialize Firebase
 try:
     firebase_key_path = os.getenv('FIREBASE_KEY_PATH', 'firebase_key.json')
     cred = credentials.Certificate(firebase_key_path)
-    firebase_admin.initialize_app(cred)
-    db = firestore.client()
+    with startup.phase("firebase"):
+        firebase_admin.initialize_app(cred)
+        db = firestore.client()
+    store = RankingStore(db)
     logger.info("Firebase initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize Firebase: {e}")
     raise
 
-# Load ML models
+# Load and warm up the ML models now, or per worker (see utils.startup)
 try:
-    nlp, model = load_models()
-    logger.info("ML models loaded successfully")
+    inference = get_inference()
+    startup.begin(inference)
+    if not isinstance(inference, LocalInference):
+        logger.info(f"Using model server at {Config.MODEL_SERVER_SOCKET}")
+    elif Config.MODEL_LOAD_MODE == "eager":
+        logger.info("ML models loaded; each worker warms them up after the fork")
+    else:
+        logger.info("ML models will load in the background")
 except Exception as e:
     logger.error(f"Failed to load ML models: {e}")
     raise
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if not startup.is_ready():
+        startup.start_background_warmup(inference)
+    g.profiler = None
+    if Config.PROFILING_ENABLED and (request_flag({}, "profile") or request.headers.get("X-Profile") == "1"):
+        g.profiler = SamplingProfiler().start()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    if g.get("request_started") is not None:
+        metrics.observe("http_request_seconds", time.perf_counter() - g.request_started, endpoint=endpoint)
+    metrics.inc("http_requests_total", endpoint=endpoint, method=request.method, status=response.status_code)
+    if g.get("profiler") is not None:
+        response.headers["X-Profile-File"] = g.profiler.stop().write(request.endpoint or "unmatched")
+    return response
+
 @app.route("/", methods=["GET"])
 def home():
     """Health check endpoint"""
@@ -66,6 +94,12 @@ def home():
         "version": "1.0.0"
     })
 
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """Readiness probe: 200 once the models are loaded and warm, 503 before"""
+    status = startup.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
 @app.route("/health", methods=["GET"])
 def health_check():
     """Detailed health check endpoint"""
@@ -77,14 +111,79 @@ def health_check():
         logger.error(f"Firebase health check failed: {e}")
         firebase_status = "unhealthy"
 
+    try:
+        model_stats = inference.stats()
+        models_status = "healthy"
+    except Exception as e:
+        logger.error(f"Model health check failed: {e}")
+        model_stats = {}
+        models_status = "unhealthy"
+
+    index = get_vector_index()
     return jsonify({
-        "status": "healthy" if firebase_status == "healthy" else "degraded",
+        "status": "healthy" if firebase_status == models_status == "healthy" else "degraded",
         "services": {
             "firebase": firebase_status,
-            "ml_models": "healthy"
-        }
+            "ml_models": models_status
+        },
+        "ready": startup.is_ready(),
+        "startup_seconds": startup.phases(),
+        "caches": cache_stats(),
+        "vector_index": index.stats() if index else None,
+        **model_stats
     })
 
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus metrics aggregated across the gunicorn workers"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+def request_flag(data, name, default=False):
+    """Boolean option from the JSON body, falling back to the query string"""
+    value = data.get(name, request.args.get(name, default))
+    return str(value).lower() in ("true", "1", "yes")
+
+def request_int(data, name):
+    """Non-negative integer option from the JSON body or query string, or None"""
+    value = data.get(name, request.args.get(name))
+    if value is None or value == "":
+        return None
+    value = int(value)
+    if value < 0:
+        raise ValueError(f"{name} must not be negative")
+    return value
+
+def page_options(data):
+    """Paging and format options for ranking responses; raises ValueError on bad input"""
+    try:
+        return {
+            "offset": request_int(data, "offset") or 0,
+            "limit": request_int(data, "limit"),
+            "top_k": request_int(data, "top_k"),
+            "compact": request_flag(data, "compact"),
+            "stream": request_flag(data, "stream")
+                      or "application/x-ndjson" in request.headers.get("Accept", ""),
+        }
+    except (TypeError, ValueError):
+        raise ValueError("offset, limit and top_k must be non-negative integers")
+
+def ranking_response(ranked, options):
+    """The requested page of a ranking as a JSON array or streamed JSON lines"""
+    page, total = page_candidates(ranked, options["offset"], options["limit"],
+                                  options["top_k"], options["compact"])
+    if options["stream"]:
+        lines = (json.dumps(candidate, separators=(",", ":")) + "\n" for candidate in page)
+        response = Response(lines, mimetype="application/x-ndjson")
+    else:
+        response = jsonify(page)
+    response.headers["X-Total-Count"] = str(total)
+    return response
+
+def run_ranking(job_id, job_description, progress=None):
+    return rank_job(store, inference, job_id, job_description, progress)
+
+rank_jobs = RankJobQueue(db, run_ranking)
+
 @app.route("/rank", methods=["POST"])
 def rank_resumes():
     """Main endpoint for ranking resumes against job descriptions"""
@@ -100,163 +199,114 @@ def rank_resumes():
         if not job_id or not job_description:
             return jsonify({"error": "jobId and jobDescription are required"}), 400
 
-        logger.info(f"Processing ranking request for job ID: {job_id}")
+        try:
+            options = page_options(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if request_flag(data, "async", Config.RANK_ASYNC):
+            ticket, coalesced = rank_jobs.submit(job_id, job_description)
+            return jsonify({
+                "jobId": job_id,
+                "ticket": ticket["ticket"],
+                "status": ticket["status"],
+                "coalesced": coalesced,
+                "statusUrl": f"/rank/{job_id}/status",
+                "resultUrl": f"/rank/{job_id}/result"
+            }), 202
 
-        # Fetch resumes from Firestore
-        resumes_ref = db.collection("resumes")
-        query = resumes_ref.where("jobId", "==", job_id).stream()
-        resumes = [doc.to_dict() for doc in query]
-
-        if not resumes:
-            logger.warning(f"No resumes found for job ID: {job_id}")
-            return jsonify({"message": "No resumes found for this job"}), 404
-
-        # Check for cached results
-        rank_doc_ref = db.collection("resume_rankings").document(job_id)
-        existing = rank_doc_ref.get()
-        cached_data = existing.to_dict() if existing.exists else None
-
-        # Validate cache against current resumes
-        if cached_data and "ranked_resumes" in cached_data:
-            cached_emails = {r.get("email") for r in cached_data["ranked_resumes"] if r.get("email")}
-            current_emails = {r.get("email") for r in resumes if r.get("email")}
-
-            if cached_emails == current_emails:
-                logger.info("Using cached rankings - no new resumes detected")
-                return jsonify(cached_data["ranked_resumes"])
-
-            logger.info("Cache invalidated - new resumes detected, recomputing rankings")
-
-        # Process resumes
-        resume_texts = []
-        resume_names = []
-        resume_emails = []
-        resume_urls = []
-
-        for r in resumes:
-            url = r.get("resumeURL")
-            name = r.get("fullName")
-            email = r.get("email")
-
-            if not url:
-                logger.warning(f"Skipping resume without URL for {name or email}")
-                continue
-
-            try:
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
-                pdf_bytes = BytesIO(response.content)
-                text = extract_text_from_pdf(pdf_bytes)
-
-                if not text.strip():
-                    logger.warning(f"Empty text extracted from resume: {url}")
-                    continue
-
-                resume_texts.append(text)
-                resume_names.append(name)
-                resume_emails.append(email)
-                resume_urls.append(url)
-
-            except Exception as e:
-                logger.error(f"Error processing resume from {url}: {e}")
-                continue
-
-        if not resume_texts:
-            logger.warning("No valid resumes could be processed")
-            return jsonify({"message": "No valid resumes could be processed"}), 404
-
-        # Preprocess text data
-        resumes_cleaned = [preprocess_text(txt) for txt in resume_texts]
-        job_cleaned = preprocess_text(job_description)
-
-        # Generate embeddings
-        embeddings = model.encode(resumes_cleaned + [job_cleaned])
-        resume_embeddings = embeddings[:-1]
-        job_embedding = embeddings[-1].reshape(1, -1)
-
-        similarity_scores = cosine_similarity(resume_embeddings, job_embedding).flatten()
-
-        # Extract job requirements
-        job_skills = [normalize_skill(s) for s in extract_skills_dynamic(job_description)]
-        job_quals = [normalize_qualification(q) for q in extract_qualifications(job_description)]
-        job_exps = extract_experience(job_description)
-        job_min_exp, job_max_exp = parse_required_experience(job_exps)
-
-        # Process each resume
-        raw_scores = []
-        candidate_data = []
-
-        for i, score in enumerate(similarity_scores):
-            text = resume_texts[i]
-            resume_skills = [normalize_skill(s) for s in extract_skills_dynamic(text)]
-            resume_quals = [normalize_qualification(q) for q in extract_qualifications(text)]
-            work_section = extract_work_experience_section(text)
-            resume_periods = extract_work_periods(work_section)
-            total_months = total_experience_in_months(resume_periods)
-            exp_value = format_months(total_months)
-
-            # Experience matching logic
-            experience_matched = False
-            if job_min_exp is not None and total_months >= job_min_exp and (job_max_exp is None or total_months <= job_max_exp):
-                exp_match_statement = "Experience matched"
-                experience_matched = True
-            elif job_min_exp is not None:
-                exp_match_statement = "Experience not matched"
-            else:
-                exp_match_statement = "No experience requirement specified"
-                experience_matched = True
-
-            matched_skills = set(job_skills) & set(resume_skills)
-            matched_quals = set(job_quals) & set(resume_quals)
-
-            # Calculate skill F1 score
-            if job_skills and resume_skills:
-                precision = len(matched_skills) / len(resume_skills)
-                recall = len(matched_skills) / len(job_skills)
-                skill_score = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-            else:
-                skill_score = 0
-
-            # Apply penalty for missing requirements
-            final_score = skill_score
-            if not experience_matched or not matched_skills or not matched_quals:
-                final_score *= 0.3
-
-            raw_scores.append(final_score)
-            candidate_data.append({
-                "name": resume_names[i],
-                "email": resume_emails[i],
-                "skills": list(matched_skills),
-                "qualifications": list(matched_quals),
-                "experience": exp_value,
-                "Experience_Match": exp_match_statement,
-                "url": resume_urls[i],
-            })
-
-        # Normalize scores using square root scaling
-        if raw_scores:
-            max_score = max(raw_scores)
-            if max_score > 0:
-                top_score = random.randint(91, 99)
-                for i, r in enumerate(candidate_data):
-                    sqrt_scaled = (math.sqrt(raw_scores[i]) / math.sqrt(max_score)) * top_score
-                    r["score"] = round(sqrt_scaled, 2)
-
-        # Sort and rank results
-        sorted_results = sorted(candidate_data, key=lambda x: x["score"], reverse=True)
-        for idx, r in enumerate(sorted_results):
-            r["rank"] = idx + 1
-
-        # Cache results in Firestore
-        rank_doc_ref.set({"ranked_resumes": sorted_results})
-
-        logger.info(f"Successfully ranked {len(sorted_results)} resumes for job {job_id}")
-        return jsonify(sorted_results)
+        logger.info(f"Processing ranking request for job ID: {job_id}")
+        return ranking_response(run_ranking(job_id, job_description), options)
 
+    except RankingError as e:
+        return jsonify({"message": e.message}), e.status_code
     except Exception as e:
         logger.error(f"Error in rank_resumes: {e}")
         return jsonify({"error": "Internal server error occurred while ranking resumes"}), 500
 
+@app.route("/rank/<job_id>/status", methods=["GET"])
+def rank_status(job_id):
+    """Progress of the latest ranking job for a job ID"""
+    try:
+        status = rank_jobs.status(job_id)
+        if status is None:
+            return jsonify({"error": "No ranking job found for this job ID"}), 404
+        return jsonify(status)
+    except Exception as e:
+        logger.error(f"Error in rank_status: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route("/rank/<job_id>/result", methods=["GET"])
+def rank_result(job_id):
+    """Ranking result for a job, or the previous ranking while a job is still running"""
+    try:
+        try:
+            options = page_options({})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        status = rank_jobs.status(job_id)
+        ranking = store.load_ranking(job_id)
+        ranked = ranking["ranked_resumes"] if ranking else None
+
+        if status and status["status"] == "failed":
+            return jsonify({"error": status["error"]}), status.get("error_status", 500)
+        if status and status["status"] in ("queued", "running"):
+            return jsonify({
+                "status": status["status"],
+                "stage": status.get("stage"),
+                "done": status.get("done", 0),
+                "total": status.get("total", 0),
+                "partial": True,
+                "ranked_resumes": ranked or []
+            }), 202
+        if ranked is None:
+            return jsonify({"error": "No ranking found for this job ID"}), 404
+        return ranking_response(ranked, options)
+    except Exception as e:
+        logger.error(f"Error in rank_result: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route("/rank/<job_id>/invalidate", methods=["POST"])
+def rank_invalidate(job_id):
+    """Mark a job's applicants as changed so the next /rank revalidates its ranking"""
+    try:
+        store.bump_applicant_version(job_id)
+        ranking_cache().invalidate(job_id)
+        return jsonify({"jobId": job_id, "invalidated": True})
+    except Exception as e:
+        logger.error(f"Error in rank_invalidate: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route("/search", methods=["POST"])
+def search_candidates():
+    """Best indexed candidates across all jobs for a job description"""
+    try:
+        data = request.get_json()
+        if not data or not data.get("description"):
+            return jsonify({"error": "description is required"}), 400
+
+        index = get_vector_index()
+        if index is None:
+            return jsonify({"error": "Candidate search is disabled (VECTOR_INDEX_DIR is not set)"}), 503
+
+        try:
+            top_k = request_int(data, "top_k")
+            nprobe = request_int(data, "nprobe")
+        except (TypeError, ValueError):
+            return jsonify({"error": "top_k and nprobe must be non-negative integers"}), 400
+
+        start = time.perf_counter()
+        embedding = job_embedding(data["description"], inference)
+        hits = index.search(embedding, 10 if top_k is None else top_k, nprobe)
+        results = [dict(info, url=url, similarity=round(similarity, 4)) for url, similarity, info in hits]
+        return jsonify({
+            "results": results,
+            "took_ms": round((time.perf_counter() - start) * 1000, 2)
+        })
+    except Exception as e:
+        logger.error(f"Error in search_candidates: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -271,4 +321,7 @@ if __name__ == "__main__":
     debug = os.getenv('FLASK_ENV') == 'development'
 
     logger.info(f"Starting Flask ML API on port {port}")
+    # Pool processes start from a forkserver, which would re-import this script and its models
+    Config.EXTRACT_WORKERS = 0
+    startup.worker_started()
     app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Micro-benchmark for resume field extraction.
+
+Compares the precompiled single-pass scanner in ``utils.resume_utils``
+against the original per-field regex functions (kept here verbatim as the
+reference), checks that both produce the same fields and reports the time per
+resume. The scan cache is cleared between iterations so the numbers measure
+the regexes rather than memoization.
+
+    python -m benchmarks.bench_extraction [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+from datetime import datetime
+
+from dateutil import parser as date_parser
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import resume_utils  # noqa: E402
+
+
+# Reference implementations as they were before the single-pass scanner
+def legacy_preprocess_text(text):
+    text = re.sub(r'([a-zA-Z])\.([a-zA-Z])', r'\1.\2', text)
+    text = text.lower()
+    text = re.sub(r'[^a-zA-Z0-9_\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def legacy_extract_qualifications(text):
+    pattern = r"\b(bachelor|bachelors|bachelor's|bs|b\.tech|bsc|master|masters|master's|ms|m\.tech|msc|phd|ph\.d|m\.phil|mba|bba|computer science|engineering|it|software|cs)\b"
+    return list(set(re.findall(pattern, text.lower())))
+
+
+def legacy_extract_experience(text):
+    patterns = [
+        r'(fresh\s*(?:to|-|–)\s*\d+\s*(?:years?|months?))',
+        r'(\d+\s*(?:to|-|–)\s*\d+\s*(?:years?|months?))',
+        r'(\d+\s*(?:years?|months?))',
+    ]
+    matches = []
+    for pattern in patterns:
+        matches += re.findall(pattern, text.lower())
+    return list(set(matches))
+
+
+def legacy_extract_work_experience_section(text):
+    match = re.search(r'(WORK EXPERIENCE|EXPERIENCE|EMPLOYMENT HISTORY)[:\s\n]*(.*?)(?:\n[A-Z][A-Z\s]+:|\Z)', text, re.DOTALL | re.IGNORECASE)
+    if match:
+        return match.group(2)
+    match = re.search(r'(WORK EXPERIENCE|EXPERIENCE|EMPLOYMENT HISTORY)[:\s\n]*(.*)', text, re.DOTALL | re.IGNORECASE)
+    if match:
+        return match.group(2)
+    return ""
+
+
+def legacy_extract_work_periods(text):
+    pattern1 = r'([A-Za-z]{3,9} \d{4})\s*(?:–|-|to)\s*([A-Za-z]{3,9} \d{4}|current|present)'
+    pattern2 = r'(\d{2}[/\-]\d{4})\s*(?:–|-|to)\s*(\d{2}[/\-]\d{4}|current|present)'
+    matches = re.findall(pattern1, text, re.IGNORECASE) + re.findall(pattern2, text, re.IGNORECASE)
+    periods = []
+    for start, end in matches:
+        try:
+            start_date = date_parser.parse(start)
+            end_date = datetime.today() if end.lower() in ['current', 'present'] else date_parser.parse(end)
+            if end_date < start_date:
+                continue
+            delta = relativedelta(end_date, start_date)
+            total_months = delta.years * 12 + delta.months
+            if 0 <= total_months <= 600:
+                periods.append(total_months)
+        except Exception:
+            continue
+    return periods
+
+
+# Everything the feature builder and skill extraction read from one resume
+def legacy_fields(text):
+    section = legacy_extract_work_experience_section(text)
+    return {
+        "cleaned": legacy_preprocess_text(text),
+        "quals": sorted(legacy_extract_qualifications(text)),
+        "skill_quals": sorted(legacy_extract_qualifications(text)),
+        "experience": sorted(legacy_extract_experience(text)),
+        "work_section": section,
+        "periods": sorted(legacy_extract_work_periods(section)),
+    }
+
+
+def current_fields(text):
+    fields = resume_utils.scan_resume(text)
+    return {
+        "cleaned": resume_utils.preprocess_text(text),
+        "quals": sorted(fields["quals"]),
+        "skill_quals": sorted(resume_utils.extract_qualifications(text)),
+        "experience": sorted(fields["experience"]),
+        "work_section": fields["work_section"],
+        "periods": sorted(end - start for start, end in fields["periods"]),
+    }
+
+
+def load_texts(path):
+    with open(path) as f:
+        fixture = json.load(f)
+    # Synthetic long resumes exercise the section and period regexes on realistic sizes
+    long_texts = [
+        " ".join(fixture["resumes"]) + "\nWORK EXPERIENCE:\n" +
+        "\n".join(f"Engineer at Company {i}, Jan {2000 + i} - Mar {2001 + i}, 2-3 years with Python, "
+                  f"0{1 + i % 9}/{2005 + i} to present" for i in range(20)) +
+        "\nEDUCATION:\nBS Computer Science, MBA"
+    ]
+    return fixture["resumes"] + long_texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixture", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                          "fixtures", "fidelity.json"))
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    texts = load_texts(args.fixture)
+    mismatches = [i for i, text in enumerate(texts) if legacy_fields(text) != current_fields(text)]
+
+    def run_legacy():
+        for text in texts:
+            legacy_fields(text)
+
+    def run_current():
+        resume_utils._scan_cache.clear()
+        for text in texts:
+            current_fields(text)
+
+    legacy = min(timeit.repeat(run_legacy, number=args.repeat, repeat=3)) / (args.repeat * len(texts))
+    current = min(timeit.repeat(run_current, number=args.repeat, repeat=3)) / (args.repeat * len(texts))
+    print(json.dumps({
+        "texts": len(texts),
+        "mismatches": mismatches,
+        "legacy_us_per_resume": round(legacy * 1e6, 2),
+        "current_us_per_resume": round(current * 1e6, 2),
+        "speedup": round(legacy / current, 2) if current else None,
+    }, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
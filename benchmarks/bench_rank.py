@@ -0,0 +1,281 @@
+"""
+End-to-end benchmark of the /rank pipeline.
+
+Generates synthetic resume PDFs (``benchmarks.synthetic``), serves them from a
+local HTTP server and registers them as applicants in an in-memory Firestore
+(``utils.fake_firestore``), so runs need neither network nor credentials. For
+each applicant count it times the stages separately (Firestore load, fetch,
+PDF extract, preprocess, embed, spaCy, job requirements, scoring, write-back)
+and then a cold ``rank_job`` run over fresh feature store, caches and index.
+Results are printed as JSON; save them with ``--output`` and pass a previous
+file as ``--compare`` to see per-stage ratios between commits.
+
+    python -m benchmarks.bench_rank [--sizes 10,100,1000] [--repeat 3] [--fake-models]
+
+``--fake-models`` swaps the encoder and spaCy for cheap deterministic
+stand-ins, which isolates everything around the models.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import SKILLS, job_description, make_pdf, resume_text  # noqa: E402
+from config import Config  # noqa: E402
+from utils import blob_cache, feature_store, resume_utils, vector_index  # noqa: E402
+from utils.cache import job_cache, ranking_cache  # noqa: E402
+from utils.datastore import RankingStore  # noqa: E402
+from utils.fake_firestore import FakeFirestore  # noqa: E402
+from utils.fetch import get_extract_pool, get_session  # noqa: E402
+from utils.pdf_extract import extract_pdf  # noqa: E402
+from utils.pipeline import rank_job  # noqa: E402
+from utils.ranking import build_job_requirements, new_top_score, rank_candidates, score_candidates  # noqa: E402
+
+STAGES = ("load", "fetch", "extract", "preprocess", "embed", "spacy", "job_requirements", "scoring", "write_back")
+
+
+class PdfServer:
+    """Serves ``{path: bytes}`` over HTTP/1.1 on a free localhost port"""
+
+    def __init__(self, files):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = files.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeInference:
+    """Deterministic stand-in for the models: hashed bag-of-words vectors and dictionary skills"""
+
+    dimension = 768
+    _skills = re.compile(r"\b(" + "|".join(re.escape(s) for s in SKILLS) + r")\b")
+
+    def encode_documents(self, texts):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                vectors[row, int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "little")
+                        % self.dimension] += 1
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+        return vectors
+
+    def extract_skills(self, texts):
+        return [sorted(set(self._skills.findall(text.lower()))) for text in texts]
+
+    def stats(self):
+        return {}
+
+
+@contextmanager
+def timed(stages, name):
+    started = time.perf_counter()
+    yield
+    stages[name] = time.perf_counter() - started
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _isolate(directory):
+    """Point the feature store, vector index, blob cache and caches at empty state under ``directory``"""
+    blob_cache._cache = blob_cache.BlobCache(os.path.join(directory, "blobs"))
+    feature_store._store = feature_store.FeatureStore(path=os.path.join(directory, "features.db"))
+    vector_index._index = vector_index.VectorIndex(os.path.join(directory, "vector_index"))
+    ranking_cache().clear()
+    job_cache().clear()
+    resume_utils._scan_cache.clear()
+
+
+def _add_applicants(db, job_id, base_url, files):
+    """Register one ``resumes`` document per served PDF, in batches of Firestore's 500 writes"""
+    paths = list(files)
+    for start in range(0, len(paths), 500):
+        batch = db.batch()
+        for i in range(start, min(start + 500, len(paths))):
+            batch.set(db.collection("resumes").document(f"{job_id}-{i:05d}"),
+                      {"jobId": job_id, "resumeURL": base_url + paths[i],
+                       "fullName": f"Candidate {i}", "email": f"candidate{i}@example.com"})
+        batch.commit()
+
+
+def run_once(n, inference, args, repeat):
+    rng = random.Random(args.seed * 100003 + n)
+    files = {f"/resumes/{i:05d}.pdf": make_pdf(resume_text(rng, args.resume_words, args.positions))
+             for i in range(n)}
+    description = job_description(rng, args.job_words)
+    job_id = f"bench-{n}-{repeat}"
+    stages = {}
+
+    with PdfServer(files) as server, tempfile.TemporaryDirectory() as directory:
+        db = FakeFirestore()
+        store = RankingStore(db)
+        _add_applicants(db, job_id, server.url, files)
+        _isolate(directory)
+
+        with timed(stages, "load"):
+            applicants, fingerprint, _ = store.load(job_id)
+        urls = [a["resumeURL"] for a in applicants]
+
+        session = get_session()
+        with ThreadPoolExecutor(max_workers=Config.DOWNLOAD_WORKERS) as downloads:
+            with timed(stages, "fetch"):
+                contents = list(downloads.map(lambda url: session.get(url, timeout=Config.REQUEST_TIMEOUT).content,
+                                              urls))
+            pool = get_extract_pool()
+            with timed(stages, "extract"):
+                texts = [pdf.text for pdf in downloads.map(lambda c: extract_pdf(c, pool=pool), contents)]
+
+        with timed(stages, "preprocess"):
+            cleaned = [resume_utils.preprocess_text(t) for t in texts]
+            for t in texts:
+                resume_utils.scan_resume(t)
+        with timed(stages, "embed"):
+            inference.encode_documents(cleaned)
+        with timed(stages, "spacy"):
+            inference.extract_skills(texts)
+        with timed(stages, "job_requirements"):
+            job = build_job_requirements(description, inference)
+
+        features = resume_utils.build_resume_features(texts, inference)
+        with timed(stages, "scoring"):
+            raw, candidates = score_candidates(applicants, features, job)
+            ranked, ranked_raw = rank_candidates(candidates, raw, new_top_score())
+        with timed(stages, "write_back"):
+            store.save_ranking(job_id, ranked, ranked_raw, 95, job, fingerprint=fingerprint)
+
+        # The whole pipeline again on cold state, as a fresh job would see it
+        _isolate(directory)
+        e2e_job = job_id + "-e2e"
+        _add_applicants(db, e2e_job, server.url, files)
+        started = time.perf_counter()
+        ranked = rank_job(store, inference, e2e_job, description)
+        stages["end_to_end"] = time.perf_counter() - started
+        assert len(ranked) == n, f"ranked {len(ranked)} of {n} resumes"
+
+        stages["pdf_bytes"] = sum(len(body) for body in files.values())
+    return stages
+
+
+def run_size(n, inference, args):
+    runs = [run_once(n, inference, args, repeat) for repeat in range(args.repeat)]
+    median = {name: statistics.median(run[name] for run in runs) for name in STAGES + ("end_to_end",)}
+    return {
+        "n": n,
+        "pdf_bytes": runs[0]["pdf_bytes"],
+        "stages_seconds": {name: round(median[name], 6) for name in STAGES},
+        "end_to_end_seconds": round(median["end_to_end"], 6),
+        "resumes_per_second": round(n / median["end_to_end"], 2) if median["end_to_end"] else None,
+    }
+
+
+def compare(current, baseline):
+    """Per-stage ratios current/baseline for the sizes both runs share (below 1 = faster)"""
+    previous = {size["n"]: size for size in baseline["sizes"]}
+    ratios = {}
+    for size in current["sizes"]:
+        before = previous.get(size["n"])
+        if before is None:
+            continue
+        stages = {name: round(value / before["stages_seconds"][name], 3)
+                  for name, value in size["stages_seconds"].items() if before["stages_seconds"].get(name)}
+        stages["end_to_end"] = round(size["end_to_end_seconds"] / before["end_to_end_seconds"], 3)
+        ratios[str(size["n"])] = stages
+    return {"baseline_commit": baseline.get("commit"), "ratios": ratios}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000", help="comma-separated applicant counts")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size; the median is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--resume-words", type=int, default=400)
+    parser.add_argument("--positions", type=int, default=3, help="dated positions per resume")
+    parser.add_argument("--job-words", type=int, default=150)
+    parser.add_argument("--fake-models", action="store_true", help="use deterministic stand-ins for the models")
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--compare", help="results file of a previous run to compare against")
+    args = parser.parse_args()
+
+    if args.fake_models:
+        inference = FakeInference()
+    else:
+        from utils.model_registry import get_inference, LocalInference
+        inference = get_inference()
+        if isinstance(inference, LocalInference):
+            inference.load()
+        # Keep one-off warm-up costs out of the first measured size
+        inference.encode_documents(["warm up"])
+        inference.extract_skills(["warm up"])
+
+    results = {
+        "benchmark": "rank_pipeline",
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "models": "fake" if args.fake_models else "real",
+        "encoder_backend": Config.SENTENCE_TRANSFORMER_BACKEND,
+        "settings": {key: getattr(args, key) for key in ("repeat", "seed", "resume_words", "positions", "job_words")},
+        "sizes": [run_size(int(n), inference, args) for n in args.sizes.split(",")],
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            results["comparison"] = compare(results, json.load(f))
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
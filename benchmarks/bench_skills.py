@@ -0,0 +1,97 @@
+"""
+Micro-benchmark for skill extraction.
+
+Compares the noun-chunk extraction (``SKILL_EXTRACTION_MODE=noun_chunks``,
+which runs the tagger and parser of ``SPACY_MODEL``) against the taxonomy
+matcher (``taxonomy``, tokenizer only) on the fixture resumes plus seeded
+synthetic ones, and reports the time per resume and the mean size of the
+skill sets each produces. The noun-chunk path is skipped with a note when the
+spaCy model is not installed.
+
+    python -m benchmarks.bench_skills [--count 200] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import resume_text  # noqa: E402
+from config import Config  # noqa: E402
+from utils import resume_utils  # noqa: E402
+from utils.skill_matcher import SkillMatcher  # noqa: E402
+
+
+def load_texts(fixture, count, words, seed):
+    with open(fixture) as f:
+        texts = list(json.load(f)["resumes"])
+    rng = random.Random(seed)
+    return texts + [resume_text(rng, words) for _ in range(count)]
+
+
+def measure(extract, texts, repeat):
+    """Best time over ``repeat`` runs and the skill lists of the last one"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        skills = extract(texts)
+        times.append(time.perf_counter() - started)
+    return min(times), skills
+
+
+def summarize(seconds, skills, n):
+    return {
+        "us_per_resume": round(seconds / n * 1e6, 1),
+        "resumes_per_second": round(n / seconds, 1) if seconds else None,
+        "mean_skills": round(statistics.mean(len(s) for s in skills), 1),
+        "max_skills": max(len(s) for s in skills),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixture", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                          "fixtures", "fidelity.json"))
+    parser.add_argument("--count", type=int, default=200, help="synthetic resumes added to the fixture ones")
+    parser.add_argument("--words", type=int, default=400, help="words per synthetic resume")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import spacy
+
+    texts = load_texts(args.fixture, args.count, args.words, args.seed)
+    # Both paths subtract the scanned qualifications, which the pipeline's field scan memoizes anyway
+    Config.SCAN_CACHE_SIZE = max(Config.SCAN_CACHE_SIZE, len(texts))
+    for text in texts:
+        resume_utils.scan_resume(text)
+    results = {"texts": len(texts), "taxonomy_path": Config.SKILL_TAXONOMY_PATH}
+
+    started = time.perf_counter()
+    matcher = SkillMatcher(spacy.blank(Config.SPACY_MODEL.split("_")[0]))
+    results["taxonomy_compile_seconds"] = round(time.perf_counter() - started, 3)
+    matcher.extract(texts[:1])
+    seconds, skills = measure(lambda batch: resume_utils.extract_skills_taxonomy(batch, matcher), texts, args.repeat)
+    results["taxonomy"] = summarize(seconds, skills, len(texts))
+
+    try:
+        nlp = spacy.load(Config.SPACY_MODEL, exclude=Config.SPACY_EXCLUDE)
+    except OSError:
+        results["noun_chunks"] = f"skipped: spaCy model {Config.SPACY_MODEL} is not installed"
+    else:
+        resume_utils.extract_skills_batch(texts[:1], nlp)
+        seconds, skills = measure(lambda batch: resume_utils.extract_skills_batch(batch, nlp), texts, args.repeat)
+        results["noun_chunks"] = summarize(seconds, skills, len(texts))
+        results["speedup"] = round(results["noun_chunks"]["us_per_resume"] / results["taxonomy"]["us_per_resume"], 1)
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
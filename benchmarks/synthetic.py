@@ -0,0 +1,92 @@
+"""
+Synthetic resumes and job descriptions for benchmarks.
+
+Everything is generated from a seeded ``random.Random``, so the same seed and
+sizes always give byte-identical PDFs. Resumes mix skills, degrees, dated
+work history and filler prose in the shapes the extraction regexes look for;
+``make_pdf`` writes a minimal uncompressed PDF that PyPDF2 can parse, with no
+extra dependencies.
+"""
+
+SKILLS = [
+    "python", "java", "javascript", "typescript", "sql", "postgresql", "mongodb", "react", "angular",
+    "node.js", "django", "flask", "spring boot", "docker", "kubernetes", "aws", "azure", "gcp",
+    "machine learning", "deep learning", "data analysis", "pandas", "numpy", "tensorflow", "pytorch",
+    "git", "linux", "rest apis", "graphql", "microservices", "ci/cd", "terraform", "spark", "kafka",
+]
+DEGREES = [
+    "Bachelor of Science in Computer Science", "BS Software Engineering", "Master of Science in IT",
+    "MBA", "PhD in Computer Science", "B.Tech in Engineering", "MSc Data Science",
+]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+FILLER = (
+    "designed built maintained delivered improved scalable services for customers across teams with "
+    "focus on reliability performance quality testing documentation mentoring stakeholders product"
+).split()
+
+
+def resume_text(rng, words=400, jobs=3):
+    """A resume of roughly ``words`` words with ``jobs`` dated positions"""
+    lines = [f"Candidate {rng.randrange(10 ** 6)}", f"candidate{rng.randrange(10 ** 6)}@example.com",
+             "SKILLS", ", ".join(rng.sample(SKILLS, rng.randint(4, 12))),
+             "EDUCATION", rng.choice(DEGREES), "WORK EXPERIENCE"]
+    year = 2024
+    for _ in range(jobs):
+        start = year - rng.randint(1, 4)
+        lines.append(f"Engineer at Company {rng.randrange(1000)}, "
+                     f"{rng.choice(MONTHS)} {start} - {rng.choice(MONTHS)} {year}")
+        year = start
+    lines.append(f"{rng.randint(1, 12)} years experience with {rng.choice(SKILLS)}")
+    remaining = max(0, words - sum(len(line.split()) for line in lines))
+    while remaining > 0:
+        sentence = rng.sample(FILLER, min(12, remaining)) + [rng.choice(SKILLS)]
+        lines.append(" ".join(sentence) + ".")
+        remaining -= len(sentence)
+    return "\n".join(lines)
+
+
+def job_description(rng, words=150):
+    """A job description of roughly ``words`` words with skill, degree and experience requirements"""
+    low = rng.randint(1, 5)
+    parts = [f"We are hiring a software engineer with {low}-{low + rng.randint(1, 5)} years of experience.",
+             f"Required: {', '.join(rng.sample(SKILLS, 8))}.",
+             f"A {rng.choice(DEGREES).lower()} or equivalent is expected."]
+    remaining = max(0, words - sum(len(p.split()) for p in parts))
+    while remaining > 0:
+        sentence = rng.sample(FILLER, min(12, remaining))
+        parts.append(" ".join(sentence) + ".")
+        remaining -= len(sentence)
+    return " ".join(parts)
+
+
+def _escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(text, lines_per_page=50):
+    """Minimal single-font PDF holding ``text``, ``lines_per_page`` lines per page"""
+    lines = text.split("\n")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, page in enumerate(pages):
+        stream = ("BT /F1 10 Tf 40 760 Td 14 TL "
+                  + " ".join(f"({_escape(line)}) Tj T*" for line in page) + " ET").encode("latin-1", "replace")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
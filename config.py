@@ -18,11 +18,86 @@ class Config:
     
     # Request settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    REQUEST_TIMEOUT = 30  # seconds
+    REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', 30))  # seconds per resume download
+
+    # Resume fetch/extract stage
+    DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', 16))  # concurrent HTTP downloads
+    EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))  # PDF parsing processes per host, 0 = in-thread
+    SERVER_WORKERS = int(os.getenv('WORKERS', 1))  # processes sharing EXTRACT_WORKERS; gunicorn sets its worker count
+    RANK_DEADLINE = float(os.getenv('RANK_DEADLINE', 90))  # seconds per job, keep below the gunicorn timeout
+    PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', 15))  # pages read per resume, 0 = all
+    PDF_MAX_CHARS = int(os.getenv('PDF_MAX_CHARS', 100000))  # stop reading pages past this, 0 = no limit
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 8))  # split longer PDFs across the pool
+    MAX_DOWNLOAD_BYTES = int(os.getenv('MAX_DOWNLOAD_BYTES', MAX_CONTENT_LENGTH))  # larger resumes are rejected
+    DOWNLOAD_SPOOL_KB = int(os.getenv('DOWNLOAD_SPOOL_KB', 1024))  # kept in memory, larger bodies spill to disk
+    BLOB_CACHE_DIR = os.getenv('BLOB_CACHE_DIR', 'cache/blobs')  # downloads kept for conditional requests, empty = off
+    BLOB_CACHE_MAX_MB = int(os.getenv('BLOB_CACHE_MAX_MB', 1024))
+
+    # Asynchronous ranking jobs
+    RANK_ASYNC = os.getenv('RANK_ASYNC', 'false').lower() == 'true'  # default mode for POST /rank
+    RANK_JOB_WORKERS = int(os.getenv('RANK_JOB_WORKERS', 2))  # background ranking threads per worker
+    RANK_JOB_STALE_SECONDS = float(os.getenv('RANK_JOB_STALE_SECONDS', 180))
+
+    # Firestore access
+    FIRESTORE_PAGE_SIZE = int(os.getenv('FIRESTORE_PAGE_SIZE', 500))  # applicants per query page
+    RANKING_SHARD_SIZE = int(os.getenv('RANKING_SHARD_SIZE', 500))  # ranked candidates per shard document
+    # Trust resume_rankings/{jobId}.applicant_version, bumped by whatever writes resumes
+    APPLICANT_VERSIONING = os.getenv('APPLICANT_VERSIONING', 'false').lower() == 'true'
+
+    # In-process caches (optionally shared by the workers through SQLite)
+    RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', 256))  # rankings per worker
+    RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', 30))  # seconds a cached ranking is served
+    JOB_CACHE_SIZE = int(os.getenv('JOB_CACHE_SIZE', 512))  # parsed job requirements per worker
+    JOB_CACHE_TTL = float(os.getenv('JOB_CACHE_TTL', 3600))
+    SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH', '')  # e.g. cache/shared_cache.db, empty = per worker only
+    SHARED_CACHE_MAX_ENTRIES = int(os.getenv('SHARED_CACHE_MAX_ENTRIES', 4096))
+
+    # Metrics and profiling
+    METRICS_DIR = os.getenv('METRICS_DIR', 'cache/metrics')  # per-worker metric files, empty = this process only
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'  # allow ?profile=true
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'cache/profiles')
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+
+    # Per-resume feature store
+    FEATURE_STORE_PATH = os.getenv('FEATURE_STORE_PATH', 'cache/resume_features.db')
+    FEATURE_STORE_MAX_MB = int(os.getenv('FEATURE_STORE_MAX_MB', 512))
+
+    # Cross-job candidate search
+    VECTOR_INDEX_DIR = os.getenv('VECTOR_INDEX_DIR', 'cache/vector_index')  # empty = no index, /search disabled
+    VECTOR_INDEX_NPROBE = int(os.getenv('VECTOR_INDEX_NPROBE', 8))  # IVF lists scanned per search, 0 = all
     
     # ML Model settings
     SPACY_MODEL = 'en_core_web_lg'
     SENTENCE_TRANSFORMER_MODEL = 'all-mpnet-base-v2'
+    MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', 'cache/models')  # downloaded encoder weights
+    MODELS_OFFLINE = os.getenv('MODELS_OFFLINE', 'false').lower() == 'true'  # never download models at runtime
+    MODEL_LOAD_MODE = os.getenv('MODEL_LOAD_MODE', 'eager')  # eager (at import) or background (per worker)
+    SENTENCE_TRANSFORMER_BACKEND = os.getenv('SENTENCE_TRANSFORMER_BACKEND', 'torch')  # torch, torch-int8, onnx, onnx-int8
+    ONNX_CACHE_DIR = os.getenv('ONNX_CACHE_DIR', 'cache/onnx')
+    ENCODER_FIDELITY_MIN_SPEARMAN = float(os.getenv('ENCODER_FIDELITY_MIN_SPEARMAN', 0.9))
+    # Pipes skill extraction never reads are not loaded; it reads noun chunks and the NER's LANGUAGE entities
+    SPACY_EXCLUDE = [p for p in os.getenv('SPACY_EXCLUDE', 'lemmatizer').split(',') if p]
+    SPACY_BATCH_SIZE = int(os.getenv('SPACY_BATCH_SIZE', 32))
+    SPACY_N_PROCESS = int(os.getenv('SPACY_N_PROCESS', 1))
+    SKILL_EXTRACTION_MODE = os.getenv('SKILL_EXTRACTION_MODE', 'noun_chunks')  # noun_chunks (parser) or taxonomy
+    SKILL_TAXONOMY_PATH = os.getenv('SKILL_TAXONOMY_PATH', 'data/skills_taxonomy.json')
+    SCAN_CACHE_SIZE = int(os.getenv('SCAN_CACHE_SIZE', 1024))  # memoized regex field scans per worker
+
+    # Embedding engine settings
+    EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', 32))
+    EMBED_MAX_SEQ_LENGTH = int(os.getenv('EMBED_MAX_SEQ_LENGTH', 384))  # mpnet's trained limit
+    TORCH_NUM_THREADS = int(os.getenv('TORCH_NUM_THREADS', 0))  # encoder intra-op threads, 0 leaves the default
+    EMBED_CHUNKED = os.getenv('EMBED_CHUNKED', 'false').lower() == 'true'  # embed long resumes window by window
+    EMBED_CHUNK_STRIDE = int(os.getenv('EMBED_CHUNK_STRIDE', 0))  # tokens between window starts, 0 = no overlap
+    EMBED_MAX_CHUNKS = int(os.getenv('EMBED_MAX_CHUNKS', 8))
+
+    # Shared model server (empty socket path = load models in every worker)
+    MODEL_SERVER_SOCKET = os.getenv('MODEL_SERVER_SOCKET', '')
+    MODEL_SERVER_AUTHKEY = os.getenv('MODEL_SERVER_AUTHKEY', '')  # empty = gunicorn generates one per start
+    MODEL_SERVER_BATCH_WINDOW_MS = float(os.getenv('MODEL_SERVER_BATCH_WINDOW_MS', 5))
+    MODEL_SERVER_MAX_BATCH = int(os.getenv('MODEL_SERVER_MAX_BATCH', 256))  # texts per micro-batch
+    MODEL_SERVER_CONNECT_TIMEOUT = float(os.getenv('MODEL_SERVER_CONNECT_TIMEOUT', 180))  # covers model load time
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -36,8 +111,12 @@ class ProductionConfig(Config):
     
     # Override with more secure settings for production
     SECRET_KEY = os.getenv('SECRET_KEY')
-    if not SECRET_KEY:
-        raise ValueError("SECRET_KEY environment variable must be set in production")
+
+    @classmethod
+    def validate(cls):
+        """Fail fast on settings that must be provided in production"""
+        if not cls.SECRET_KEY:
+            raise ValueError("SECRET_KEY environment variable must be set in production")
 
 class TestingConfig(Config):
     """Testing configuration"""
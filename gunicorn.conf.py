@@ -3,6 +3,9 @@ Gunicorn configuration for ML Model API
 """
 
 import os
+import secrets
+import sys
+import subprocess
 import multiprocessing
 
 # Server socket
@@ -48,6 +51,31 @@ limit_request_field_size = 8190
 # Application
 preload_app = True
 
+# Shared model server, started alongside the workers when MODEL_SERVER_SOCKET is set
+model_server_process = None
+
+def on_starting(server):
+    """Called just before the master process is initialized."""
+    global model_server_process
+    from config import Config
+    from utils.metrics import clear_directory
+    clear_directory()
+    # Workers split the host's PDF parsing processes between them (see utils.fetch)
+    Config.SERVER_WORKERS = server.num_workers
+    if os.getenv('MODEL_SERVER_SOCKET'):
+        if not Config.MODEL_SERVER_AUTHKEY:
+            # A fresh key per start; the workers inherit it from the master when forked
+            Config.MODEL_SERVER_AUTHKEY = secrets.token_hex(32)
+        env = dict(os.environ, MODEL_SERVER_AUTHKEY=Config.MODEL_SERVER_AUTHKEY)
+        model_server_process = subprocess.Popen([sys.executable, "-m", "utils.model_server"], env=env)
+        server.log.info("Model server started (pid: %s)", model_server_process.pid)
+
+def on_exit(server):
+    """Called just before exiting gunicorn."""
+    if model_server_process is not None:
+        model_server_process.terminate()
+        model_server_process.wait(timeout=30)
+
 def when_ready(server):
     """Called just after the server is started."""
     server.log.info("ML Model API server is ready. Listening on: %s", server.address)
@@ -63,6 +91,8 @@ def pre_fork(server, worker):
 def post_fork(server, worker):
     """Called just after a worker has been forked."""
     server.log.info("Worker spawned (pid: %s)", worker.pid)
+    from utils.startup import worker_started
+    worker_started()
 
 def worker_abort(worker):
     """Called when a worker receives the SIGABRT signal."""
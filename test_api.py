@@ -6,6 +6,7 @@ Simple test script for the ML Model API
 import requests
 import json
 import sys
+import time
 
 API_BASE_URL = "http://localhost:5001"
 
@@ -79,6 +80,38 @@ def test_rank_endpoint():
         print(f"❌ Rank endpoint failed with error: {e}")
         return False
 
+def test_async_rank_endpoint():
+    """Test queueing a ranking job and polling its status"""
+    print("🔍 Testing async rank endpoint...")
+
+    test_data = {
+        "jobId": "test-job-123",
+        "description": "We are looking for a Python developer with experience in machine learning and Flask. Bachelor's degree required. 2-3 years experience preferred.",
+        "async": True
+    }
+
+    try:
+        response = requests.post(f"{API_BASE_URL}/rank", json=test_data, timeout=10)
+        if response.status_code != 202:
+            print(f"❌ Async rank endpoint failed with status: {response.status_code}")
+            return False
+
+        ticket = response.json()
+        for _ in range(30):
+            status = requests.get(f"{API_BASE_URL}{ticket['statusUrl']}", timeout=10).json()
+            if status["status"] in ("done", "failed"):
+                break
+            time.sleep(1)
+
+        if status["status"] == "done" or "No resumes found" in (status.get("error") or ""):
+            print(f"✅ Async rank endpoint passed: ticket {ticket['ticket']} {status['status']}")
+            return True
+        print(f"❌ Async rank job did not finish: {status}")
+        return False
+    except Exception as e:
+        print(f"❌ Async rank endpoint failed with error: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🧪 Starting ML Model API Tests...")
@@ -87,7 +120,8 @@ def main():
     tests = [
         test_basic_endpoint,
         test_health_check,
-        test_rank_endpoint
+        test_rank_endpoint,
+        test_async_rank_endpoint
     ]
     
     passed = 0
@@ -0,0 +1,78 @@
+"""
+RankJobQueue tickets against the in-memory Firestore.
+
+Run with ``pytest tests/``.
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from utils.fake_firestore import FakeFirestore  # noqa: E402
+from utils.jobs import RankJobQueue  # noqa: E402
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_superseded_run_stops_without_touching_the_new_ticket():
+    db = FakeFirestore()
+    started = {"old": threading.Event(), "new": threading.Event()}
+    release = {"old": threading.Event(), "new": threading.Event()}
+    saved = []
+
+    def runner(job_id, description, progress):
+        progress("features")
+        started[description].set()
+        release[description].wait(5)
+        progress("saving")
+        saved.append(description)
+        return [description]
+
+    queue = RankJobQueue(db, runner, workers=2)
+    old, _ = queue.submit("job", "old")
+    wait_for(started["old"].is_set)
+    new, coalesced = queue.submit("job", "new")
+    assert not coalesced
+    wait_for(started["new"].is_set)
+
+    # The old run wakes up after being superseded: it must neither save nor overwrite the status
+    release["old"].set()
+    wait_for(lambda: "job" not in queue._active or queue._active["job"] is new)
+    time.sleep(0.05)
+    assert saved == []
+    status = queue.status("job")
+    assert status["ticket"] == new["ticket"]
+    assert status["stage"] == "features"
+
+    release["new"].set()
+    wait_for(lambda: queue.status("job")["status"] == "done")
+    assert saved == ["new"]
+    assert queue.status("job")["ticket"] == new["ticket"]
+
+
+def test_heartbeat_keeps_a_long_stage_fresh(monkeypatch):
+    monkeypatch.setattr(Config, "RANK_JOB_STALE_SECONDS", 0.2)
+    db = FakeFirestore()
+    release = threading.Event()
+
+    def runner(job_id, description, progress):
+        progress("features")
+        release.wait(5)
+        return []
+
+    queue = RankJobQueue(db, runner, workers=1)
+    ticket, _ = queue.submit("job", "description")
+    wait_for(lambda: queue.status("job")["stage"] == "features")
+    time.sleep(0.5)
+    assert time.time() - queue.status("job")["updated_at"] < Config.RANK_JOB_STALE_SECONDS
+    release.set()
+    wait_for(lambda: queue.status("job")["status"] == "done")
@@ -0,0 +1,68 @@
+"""
+Metrics aggregation across worker processes.
+
+Run with ``pytest tests/``.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from utils import metrics  # noqa: E402
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_flushed", False)
+    metrics._counters.clear()
+    metrics._histograms.clear()
+    yield tmp_path
+    metrics._counters.clear()
+    metrics._histograms.clear()
+
+
+def worker(downloads):
+    """Fork a worker that counts ``downloads`` and exits"""
+    pid = os.fork()
+    if pid == 0:
+        metrics.inc("downloads_total", downloads, outcome="downloaded")
+        metrics.flush()
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+
+def downloads(text):
+    line = next(line for line in text.splitlines() if line.startswith("ml_api_downloads_total{"))
+    return int(line.split()[-1])
+
+
+def test_exited_workers_are_archived_not_kept(directory):
+    for count in (2, 3, 5):
+        worker(count)
+    metrics.inc("downloads_total", 7, outcome="downloaded")
+
+    assert downloads(metrics.render()) == 17
+    files = {name for name in os.listdir(directory) if name.startswith("metrics-")}
+    assert files == {metrics.ARCHIVE, f"metrics-{os.getpid()}.json"}
+
+    worker(1)
+    assert downloads(metrics.render()) == 18
+    assert downloads(metrics.render()) == 18
+
+
+def test_reused_pid_does_not_overwrite_a_dead_workers_counts(directory):
+    path = directory / f"metrics-{os.getpid()}.json"
+    path.write_text(json.dumps({
+        "pid": os.getpid(), "gauges": [], "histograms": [],
+        "counters": [["downloads_total", {"outcome": "downloaded"}, 4]],
+    }))
+    metrics.inc("downloads_total", 1, outcome="downloaded")
+    metrics.flush()
+
+    assert downloads(metrics.render()) == 5
@@ -0,0 +1,182 @@
+"""
+rank_job against the in-memory Firestore and a local resume server.
+
+Run with ``pytest tests/``. Models are replaced by the deterministic stand-ins
+from ``benchmarks.bench_rank``, so no model or network access is needed.
+"""
+
+import os
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_rank import FakeInference  # noqa: E402
+from benchmarks.synthetic import make_pdf, resume_text  # noqa: E402
+from config import Config  # noqa: E402
+from utils import blob_cache, feature_store, fetch, resume_utils, vector_index  # noqa: E402
+from utils.cache import job_cache, ranking_cache  # noqa: E402
+from utils.datastore import RankingStore  # noqa: E402
+from utils.fake_firestore import FakeFirestore  # noqa: E402
+from utils.pipeline import rank_job  # noqa: E402
+
+DESCRIPTION = "Python developer with SQL and Docker, 2-3 years experience."
+
+
+class ResumeServer:
+    """Serves ``files`` by path; paths in ``broken`` answer 404"""
+
+    def __init__(self, files):
+        self.files = files
+        self.broken = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = server.files.get(self.path)
+                if body is None or self.path in server.broken:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "EXTRACT_WORKERS", 0)
+    monkeypatch.setattr(Config, "APPLICANT_VERSIONING", False)
+    monkeypatch.setattr(fetch, "_extract_pool", None)
+    monkeypatch.setattr(feature_store, "_store", feature_store.FeatureStore(path=str(tmp_path / "features.db")))
+    monkeypatch.setattr(vector_index, "_index", vector_index.VectorIndex(str(tmp_path / "vector_index")))
+    monkeypatch.setattr(blob_cache, "_cache", blob_cache.BlobCache(str(tmp_path / "blobs")))
+    ranking_cache().clear()
+    job_cache().clear()
+    resume_utils._scan_cache.clear()
+    yield
+    ranking_cache().clear()
+    job_cache().clear()
+
+
+@pytest.fixture
+def server():
+    rng = random.Random(0)
+    server = ResumeServer({f"/resumes/{i}.pdf": make_pdf(resume_text(rng, 120)) for i in range(5)})
+    yield server
+    server.close()
+
+
+def add_applicants(db, job_id, server):
+    batch = db.batch()
+    for i, path in enumerate(server.files):
+        batch.set(db.collection("resumes").document(f"{job_id}-{i}"),
+                  {"jobId": job_id, "resumeURL": server.url + path,
+                   "fullName": f"Candidate {i}", "email": f"candidate{i}@example.com"})
+    batch.commit()
+
+
+def ranked_urls(ranking):
+    return sorted(candidate["url"] for candidate in ranking)
+
+
+def test_unchanged_applicants_reuse_the_stored_ranking(server):
+    db = FakeFirestore()
+    store = RankingStore(db)
+    add_applicants(db, "job", server)
+
+    first = rank_job(store, FakeInference(), "job", DESCRIPTION)
+    ranking_cache().clear()
+    writes = db.stats["writes"]
+    second = rank_job(store, FakeInference(), "job", DESCRIPTION)
+
+    assert len(first) == 5
+    assert ranked_urls(second) == ranked_urls(first)
+    assert db.stats["writes"] == writes
+
+
+@pytest.mark.parametrize("versioning", [False, True])
+def test_failed_resume_is_retried_once_it_recovers(server, monkeypatch, versioning):
+    monkeypatch.setattr(Config, "APPLICANT_VERSIONING", versioning)
+    db = FakeFirestore()
+    store = RankingStore(db)
+    add_applicants(db, "job", server)
+    server.broken.add("/resumes/3.pdf")
+
+    first = rank_job(store, FakeInference(), "job", DESCRIPTION)
+    assert len(first) == 4
+    assert store.ranking_meta("job")["pending"] == [server.url + "/resumes/3.pdf"]
+
+    # No applicant changed, but the failed resume must not be frozen out by the stored ranking
+    server.broken.clear()
+    second = rank_job(store, FakeInference(), "job", DESCRIPTION)
+    assert len(second) == 5
+    assert server.url + "/resumes/3.pdf" in ranked_urls(second)
+    assert store.ranking_meta("job")["pending"] == []
+
+
+def test_index_keeps_resumes_shared_with_another_job(server):
+    db = FakeFirestore()
+    store = RankingStore(db)
+    add_applicants(db, "job-a", server)
+    add_applicants(db, "job-b", server)
+    rank_job(store, FakeInference(), "job-a", DESCRIPTION)
+    rank_job(store, FakeInference(), "job-b", DESCRIPTION)
+
+    index = vector_index.get_vector_index()
+    query = [1.0] * index.stats()["dimension"]
+    hits = index.search(query, top_k=10)
+    assert len(hits) == 5
+    assert all(info["jobIds"] == ["job-a", "job-b"] for _, _, info in hits)
+
+    # Withdrawing from job-a must leave the resume searchable for job-b
+    db.collection("resumes").document("job-a-3").delete()
+    ranking_cache().clear()
+    rank_job(store, FakeInference(), "job-a", DESCRIPTION)
+    jobs = {url: info["jobIds"] for url, _, info in index.search(query, top_k=10)}
+    assert len(jobs) == 5
+    assert jobs[server.url + "/resumes/3.pdf"] == ["job-b"]
+
+    db.collection("resumes").document("job-b-3").delete()
+    ranking_cache().clear()
+    rank_job(store, FakeInference(), "job-b", DESCRIPTION)
+    assert server.url + "/resumes/3.pdf" not in {url for url, _, _ in index.search(query, top_k=10)}
+
+
+def test_unchanged_rankings_leave_the_index_view_valid(server):
+    db = FakeFirestore()
+    store = RankingStore(db)
+    add_applicants(db, "job-a", server)
+    add_applicants(db, "job-b", server)
+    rank_job(store, FakeInference(), "job-a", DESCRIPTION)
+
+    index = vector_index.get_vector_index()
+    query = [1.0] * index.stats()["dimension"]
+    index.search(query)
+    view = index._view
+    # Re-ranking, and indexing the same resumes for another job, write no rows
+    ranking_cache().clear()
+    rank_job(store, FakeInference(), "job-a", DESCRIPTION)
+    rank_job(store, FakeInference(), "job-b", DESCRIPTION)
+    hits = index.search(query)
+    assert index._view is view
+    assert all(info["jobIds"] == ["job-a", "job-b"] for _, _, info in hits)
@@ -0,0 +1,44 @@
+"""
+Taxonomy skill matching.
+
+Run with ``pytest tests/``; the matcher test needs spaCy and is skipped
+without it.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.resume_utils import normalize_skill  # noqa: E402
+from utils.skill_matcher import SkillMatcher, check_taxonomy, load_taxonomy  # noqa: E402
+
+
+def test_shipped_taxonomy_is_unambiguous():
+    check_taxonomy(load_taxonomy())
+
+
+def test_languages_differing_only_in_symbols_stay_distinct():
+    assert len({normalize_skill(s) for s in ["c", "c++", "c#", "C Sharp"]}) == 3
+    assert normalize_skill("c plus plus") == normalize_skill("C++")
+
+
+@pytest.mark.parametrize("taxonomy", [
+    {"node.js": [], "node": []},
+    {"python": ["py"], "pyspark": ["py"]},
+])
+def test_colliding_skills_are_refused(taxonomy):
+    with pytest.raises(ValueError, match="Ambiguous skill taxonomy"):
+        check_taxonomy(taxonomy)
+
+
+def test_matcher_reports_each_language_under_its_own_name():
+    spacy = pytest.importorskip("spacy")
+    matcher = SkillMatcher(spacy.blank("en"))
+    csharp, cpp = matcher.extract(["Backend work in C# and .NET core", "Embedded systems in C++ and cpp"])
+    assert "c#" in csharp and "c++" not in csharp
+    assert "c++" in cpp and "c#" not in cpp
+    with pytest.raises(ValueError):
+        SkillMatcher(spacy.blank("en"), {"c++": [], "cplusplus": []})
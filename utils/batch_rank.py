@@ -0,0 +1,280 @@
+"""
+Offline bulk ranking over local PDFs.
+
+Runs the same extraction, feature and scoring code as ``/rank`` over a
+directory (searched recursively for ``*.pdf``) or a tarball of resumes and a
+file of job descriptions, with no Firebase and no network:
+
+    python -m utils.batch_rank resumes/ jobs.jsonl --out results/ [--format npy|parquet]
+
+Jobs are read from JSON lines or a JSON list of ``{"jobId", "description"}``
+objects, or from a plain text file holding one description (its name is the
+job ID).
+
+PDFs are parsed on a process pool and features are computed in batches of
+``--batch-size`` (one embedding batch and one ``nlp.pipe`` call each). Every
+batch is checkpointed to ``out/features/part-NNNNN`` as soon as it is done:
+an ``.npy`` of embeddings plus a ``.jsonl`` of the remaining features (or one
+``.parquet`` file with ``--format parquet``, which needs pyarrow). A rerun
+skips resumes already in a part, so an interrupted run picks up where it
+stopped. Each job is then ranked over every resume and written to
+``out/rankings/{jobId}.jsonl``; ``out/jobs.jsonl`` records finished jobs, which
+are skipped on rerun while their description and the resume set are unchanged.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from config import Config
+from utils.feature_store import content_hash
+from utils.model_registry import get_inference, LocalInference
+from utils.pdf_extract import extract_pdf
+from utils.ranking import build_job_requirements, description_hash, new_top_score, rank_candidates, score_candidates
+from utils.resume_utils import build_resume_features
+
+logger = logging.getLogger(__name__)
+
+
+def iter_sources(path):
+    """Yield ``(resume_id, source)`` for every PDF under a directory or in a tarball"""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".pdf"):
+                    full = os.path.join(root, name)
+                    yield os.path.relpath(full, path), full
+    elif tarfile.is_tarfile(path):
+        # Tar members are read sequentially here and shipped to the pool as bytes
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(".pdf"):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"{path} is neither a directory nor a tar archive")
+
+
+def load_jobs(path):
+    """Read ``[(job_id, description)]`` from JSON lines, a JSON list or a text file"""
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    if not path.endswith((".json", ".jsonl")):
+        return [(os.path.splitext(os.path.basename(path))[0], content)]
+    if path.endswith(".json"):
+        records = json.loads(content)
+    else:
+        records = [json.loads(line) for line in content.splitlines() if line.strip()]
+    return [(str(r["jobId"]), r["description"]) for r in records]
+
+
+# Runs in a pool process: hash and parse one PDF
+def _extract(item):
+    resume_id, source = item
+    try:
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                digest = content_hash(f.read())
+        else:
+            digest = content_hash(source)
+        pdf = extract_pdf(source)
+        if not pdf.ok:
+            return resume_id, digest, "", f"extract failed: {pdf.error}"
+        return resume_id, digest, pdf.text, None
+    except Exception as e:
+        return resume_id, None, "", str(e)
+
+
+class FeatureParts:
+    """Checkpointed per-batch feature files under ``out/features``"""
+
+    def __init__(self, directory, output_format="npy"):
+        self.directory = os.path.join(directory, "features")
+        self.format = output_format
+        os.makedirs(self.directory, exist_ok=True)
+        if output_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError as e:
+                raise ImportError("--format parquet requires the pyarrow package") from e
+
+    def _parts(self):
+        # A part counts once its final file exists: the .jsonl is written after the .npy
+        extension = ".parquet" if self.format == "parquet" else ".jsonl"
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.startswith("part-") and name.endswith(extension))
+
+    def load(self):
+        """Return ``(records, embeddings)`` of every finished part"""
+        records, embeddings = [], []
+        for path in self._parts():
+            if self.format == "parquet":
+                import pyarrow.parquet as pq
+                table = pq.read_table(path).to_pylist()
+                for row in table:
+                    embeddings.append(np.asarray(row.pop("embedding"), dtype=np.float32))
+                    row["periods"] = json.loads(row["periods"])
+                    records.append(row)
+            else:
+                with open(path, encoding="utf-8") as f:
+                    part = [json.loads(line) for line in f]
+                vectors = np.load(path[:-len(".jsonl")] + ".npy")
+                records.extend(part)
+                embeddings.extend(vectors)
+        return records, embeddings
+
+    def write(self, records, embeddings):
+        """Atomically write one part; records without features carry an ``error``"""
+        name = os.path.join(self.directory, f"part-{len(self._parts()):05d}")
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            rows = [dict(r, periods=json.dumps(r["periods"]), embedding=list(map(float, e)))
+                    for r, e in zip(records, matrix)]
+            pq.write_table(pa.Table.from_pylist(rows), name + ".parquet.tmp")
+            os.replace(name + ".parquet.tmp", name + ".parquet")
+            return
+        with open(name + ".npy.tmp", "wb") as f:
+            np.save(f, matrix)
+        os.replace(name + ".npy.tmp", name + ".npy")
+        with open(name + ".jsonl.tmp", "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        os.replace(name + ".jsonl.tmp", name + ".jsonl")
+
+
+def compute_features(sources, parts, inference, workers, batch_size):
+    """Extract and featurise every resume not yet checkpointed; returns the number done"""
+    done = {r["id"] for r in parts.load()[0]}
+    pending = ((resume_id, source) for resume_id, source in sources if resume_id not in done)
+    processed = 0
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+
+    # Sources are read one batch at a time so a tarball is never held in memory whole
+    def extract_batch():
+        batch = list(islice(pending, batch_size))
+        if not batch:
+            return None
+        if pool is None:
+            return map(_extract, batch)
+        return pool.map(_extract, batch, chunksize=max(1, batch_size // (workers * 4)))
+
+    try:
+        current = extract_batch()
+        while current is not None:
+            batch = list(current)
+            # The next batch is parsed on the pool while this one is embedded
+            current = extract_batch()
+            processed += _featurise(batch, parts, inference)
+            logger.info(f"{len(done) + processed} resumes checkpointed "
+                        f"({processed / (time.perf_counter() - started):.1f}/s)")
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return processed
+
+
+def _featurise(batch, parts, inference):
+    ok = [(resume_id, digest, text) for resume_id, digest, text, error in batch if error is None and text.strip()]
+    features = build_resume_features([text for _, _, text in ok], inference) if ok else []
+    records, embeddings = [], []
+    for (resume_id, digest, _), f in zip(ok, features):
+        records.append({"id": resume_id, "content_hash": digest, "skills": f["skills"],
+                        "quals": f["quals"], "periods": f["periods"], "error": None})
+        embeddings.append(f["embedding"])
+    dimension = len(embeddings[0]) if embeddings else 0
+    for resume_id, digest, text, error in batch:
+        if error is not None or not text.strip():
+            logger.warning(f"Skipping {resume_id}: {error or 'no text extracted'}")
+            records.append({"id": resume_id, "content_hash": digest, "skills": [], "quals": [],
+                            "periods": [], "error": error or "no text extracted"})
+            embeddings.append(np.zeros(dimension, dtype=np.float32))
+    # Failed resumes are checkpointed too, so reruns do not parse them again
+    parts.write(records, embeddings)
+    return len(batch)
+
+
+def rank_jobs(jobs, records, out, inference, top_score=None):
+    """Rank every usable resume for each job, skipping jobs already finished"""
+    usable = [r for r in records if r["error"] is None]
+    resume_set = hashlib.sha256("\n".join(sorted(f"{r['id']}\t{r['content_hash']}" for r in usable))
+                                .encode("utf-8")).hexdigest()
+    manifest_path = os.path.join(out, "jobs.jsonl")
+    finished = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                finished[entry["jobId"]] = entry
+
+    os.makedirs(os.path.join(out, "rankings"), exist_ok=True)
+    resumes = [{"fullName": None, "email": None, "resumeURL": r["id"]} for r in usable]
+    ranked_count = 0
+    for job_id, description in jobs:
+        digest = description_hash(description)
+        previous = finished.get(job_id)
+        if previous and previous["description_hash"] == digest and previous["resume_set"] == resume_set:
+            continue
+        job = build_job_requirements(description, inference)
+        raw, candidates = score_candidates(resumes, usable, job)
+        ranked, _ = rank_candidates(candidates, raw, top_score or new_top_score())
+        path = os.path.join(out, "rankings", f"{job_id}.jsonl")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for candidate in ranked:
+                f.write(json.dumps(candidate) + "\n")
+        os.replace(path + ".tmp", path)
+        with open(manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"jobId": job_id, "description_hash": digest, "resume_set": resume_set,
+                                "candidates": len(ranked)}) + "\n")
+        ranked_count += 1
+        logger.info(f"Ranked {len(ranked)} resumes for job {job_id}")
+    return ranked_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank local resume PDFs against job descriptions offline")
+    parser.add_argument("resumes", help="directory of PDFs or a tar archive")
+    parser.add_argument("jobs", help="JSON lines / JSON list of {jobId, description}, or a text file")
+    parser.add_argument("--out", required=True, help="output and checkpoint directory")
+    parser.add_argument("--format", choices=("npy", "parquet"), default="npy")
+    parser.add_argument("--workers", type=int, default=max(1, Config.EXTRACT_WORKERS),
+                        help="PDF parsing processes, 0 = in-process")
+    parser.add_argument("--batch-size", type=int, default=256, help="resumes per feature batch and checkpoint")
+    parser.add_argument("--top-score", type=int, help="score of the best candidate (random 91-99 like /rank)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=Config.LOG_LEVEL, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    jobs = load_jobs(args.jobs)
+    parts = FeatureParts(args.out, args.format)
+    inference = get_inference()
+    if isinstance(inference, LocalInference):
+        inference.load()
+
+    started = time.perf_counter()
+    processed = compute_features(iter_sources(args.resumes), parts, inference, args.workers, args.batch_size)
+    records, _ = parts.load()
+    ranked = rank_jobs(jobs, records, args.out, inference, args.top_score)
+    print(json.dumps({
+        "resumes": len(records),
+        "resumes_processed": processed,
+        "failed": sum(1 for r in records if r["error"] is not None),
+        "jobs": len(jobs),
+        "jobs_ranked": ranked,
+        "seconds": round(time.perf_counter() - started, 2),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
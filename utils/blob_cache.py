@@ -0,0 +1,168 @@
+"""
+On-disk cache of downloaded resume PDFs for conditional requests.
+
+When a resume server returns an ``ETag`` or ``Last-Modified`` header, the
+downloaded bytes are kept under ``BLOB_CACHE_DIR`` (one file per content
+hash, shared by URLs serving identical bytes) and the validators are stored
+in a SQLite table keyed by URL. The next download of that URL sends
+``If-None-Match`` / ``If-Modified-Since``; on ``304 Not Modified`` the stored
+content hash is reused, so a resume whose features are in the feature store
+is neither downloaded nor read, and otherwise it is parsed straight from the
+cached file. The cache is bounded by ``BLOB_CACHE_MAX_MB``; least recently
+used entries are evicted first.
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    url TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access);
+CREATE INDEX IF NOT EXISTS blobs_content_hash ON blobs (content_hash);
+"""
+
+
+class CachedBlob:
+    """Validators and location of a cached download"""
+
+    __slots__ = ("url", "content_hash", "etag", "last_modified", "path")
+
+    def __init__(self, url, content_hash, etag, last_modified, path):
+        self.url = url
+        self.content_hash = content_hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.path = path
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class BlobCache:
+    """SQLite-indexed, size-bounded directory of downloaded PDFs"""
+
+    def __init__(self, directory=Config.BLOB_CACHE_DIR, max_bytes=Config.BLOB_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, "blobs.db"), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def path(self, content_hash):
+        return os.path.join(self.directory, f"{content_hash}.pdf")
+
+    def get(self, url):
+        """Return the ``CachedBlob`` for ``url``, or None if it was never cached or its file is gone"""
+        row = self._conn().execute(
+            "SELECT content_hash, etag, last_modified FROM blobs WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        digest, etag, last_modified = row
+        path = self.path(digest)
+        if not os.path.exists(path):
+            self.forget(url)
+            return None
+        return CachedBlob(url, digest, etag, last_modified, path)
+
+    def touch(self, url):
+        self._conn().execute("UPDATE blobs SET last_access = ? WHERE url = ?", (time.time(), url))
+
+    def forget(self, url):
+        self._conn().execute("DELETE FROM blobs WHERE url = ?", (url,))
+
+    def temporary_file(self):
+        """A file in the cache directory to download into, so ``put`` can rename it in place"""
+        return tempfile.NamedTemporaryFile(dir=self.directory, suffix=".part", delete=False)
+
+    def put(self, url, temporary_path, content_hash, etag, last_modified):
+        """Move a finished download into the cache and record its validators; returns its path"""
+        path = self.path(content_hash)
+        size = os.path.getsize(temporary_path)
+        # Identical bytes under another URL are already there; keep one copy
+        os.replace(temporary_path, path)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+            (url, content_hash, etag, last_modified, size, time.time()),
+        )
+        self._evict()
+        return path
+
+    def stats(self):
+        entries, total = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+        ).fetchone()
+        return {"entries": entries, "bytes": total}
+
+    def _evict(self):
+        conn = self._conn()
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the budget so eviction doesn't run on every insert
+        target = total - int(self.max_bytes * 0.9)
+        freed, evicted = 0, []
+        rows = conn.execute("SELECT url, content_hash, size FROM blobs ORDER BY last_access").fetchall()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for url, digest, size in rows:
+                if freed >= target:
+                    break
+                conn.execute("DELETE FROM blobs WHERE url = ?", (url,))
+                freed += size
+                evicted.append(digest)
+            orphans = [digest for digest in set(evicted) if conn.execute(
+                "SELECT 1 FROM blobs WHERE content_hash = ? LIMIT 1", (digest,)).fetchone() is None]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for digest in orphans:
+            try:
+                os.remove(self.path(digest))
+            except FileNotFoundError:
+                pass
+        logger.info(f"Evicted {len(evicted)} cached resume downloads ({freed / 1024:.0f} KB)")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_blob_cache():
+    """Return the per-process blob cache, or None when ``BLOB_CACHE_DIR`` is empty"""
+    global _cache
+    if _cache is None and Config.BLOB_CACHE_DIR:
+        with _cache_lock:
+            if _cache is None:
+                _cache = BlobCache()
+    return _cache
@@ -0,0 +1,209 @@
+"""
+In-process LRU/TTL caches in front of Firestore and the models.
+
+Each worker keeps small, bounded caches of finished rankings (keyed by job ID,
+stored with their description hash) and of parsed job requirements including
+the job embedding (keyed by description hash). Repeated ``/rank`` calls for a
+hot job, such as a frontend polling it, are answered from memory without
+touching Firestore or the encoder.
+
+Entries expire after a TTL, so rankings picked up from another worker's
+writes are at most ``RESULT_CACHE_TTL`` seconds old. With
+``SHARED_CACHE_PATH`` set, entries are also written to a SQLite file shared by
+all workers on the host, so one worker's result is visible to the others and
+survives worker recycling. Values must be JSON-serialisable.
+
+Every cache counts hits (local and shared), misses, evictions and
+expirations; ``cache_stats()`` reports them for ``/health``.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+"""
+
+
+class SharedCache:
+    """SQLite table of expiring JSON values shared by the workers on a host"""
+
+    def __init__(self, path, max_entries=None):
+        self.path = path
+        self.max_entries = max_entries or Config.SHARED_CACHE_MAX_ENTRIES
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        """Return ``(value, expires_at)`` for a live entry, or None"""
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, namespace, key, value, expires_at):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                     (namespace, key, json.dumps(value), expires_at))
+        (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            # Expired entries first, then the ones closest to expiry
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM entries WHERE rowid IN "
+                "(SELECT rowid FROM entries ORDER BY expires_at LIMIT MAX(0, (SELECT COUNT(*) FROM entries) - ?))",
+                (int(self.max_entries * 0.9),),
+            )
+
+    def delete(self, namespace, key):
+        self._conn().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ``ttl`` seconds"""
+
+    def __init__(self, name, max_entries, ttl, shared=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[0]
+                del self._entries[key]
+                self.stats["expirations"] += 1
+
+        if self.shared is not None:
+            try:
+                found = self.shared.get(self.name, key)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache read failed for {self.name}: {e}")
+                found = None
+            if found is not None:
+                with self._lock:
+                    self.stats["shared_hits"] += 1
+                    self._store(key, *found)
+                return found[0]
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.shared is not None:
+            try:
+                self.shared.put(self.name, key, value, expires_at)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache write failed for {self.name}: {e}")
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            try:
+                self.shared.delete(self.name, key)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache delete failed for {self.name}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+_shared = None
+
+
+def _shared_cache():
+    global _shared
+    if _shared is None and Config.SHARED_CACHE_PATH:
+        _shared = SharedCache(Config.SHARED_CACHE_PATH)
+    return _shared
+
+
+def get_cache(name, max_entries, ttl):
+    """Return the per-process cache called ``name``, creating it on first use"""
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = _caches[name] = TTLCache(name, max_entries, ttl, shared=_shared_cache())
+    return cache
+
+
+def ranking_cache():
+    return get_cache("rankings", Config.RESULT_CACHE_SIZE, Config.RESULT_CACHE_TTL)
+
+
+def job_cache():
+    return get_cache("job_requirements", Config.JOB_CACHE_SIZE, Config.JOB_CACHE_TTL)
+
+
+def cache_stats():
+    """Counters and sizes of every cache in this process"""
+    return {name: dict(cache.stats, size=len(cache)) for name, cache in _caches.items()}
+
+
+def _cache_metrics():
+    for name, cache in list(_caches.items()):
+        for event, value in cache.stats.items():
+            yield "cache_events_total", {"cache": name, "event": event}, value
+
+
+metrics.register_collector(_cache_metrics)
@@ -0,0 +1,198 @@
+"""
+Firestore access for applicants and stored rankings.
+
+Applicants are read with a projection of the fields ranking uses
+(``resumeURL``, ``fullName``, ``email``) and paged by document id in pages of
+``FIRESTORE_PAGE_SIZE``, so a large applicant set never arrives as one
+response. ``load`` issues the applicant query and the ranking lookup
+concurrently.
+
+A ranking is stored as a parent document ``resume_rankings/{jobId}`` with the
+job requirements and bookkeeping, plus the ranked candidates split across
+``resume_rankings/{jobId}/shards/{n}`` documents of ``RANKING_SHARD_SIZE``
+entries each. This keeps every document well below Firestore's 1 MiB limit.
+Shards are written with batched writes and tagged with the ranking's
+generation; a reader only accepts a complete set of shards from the parent's
+generation. Rankings stored inline by earlier versions are still read.
+
+Each stored ranking records the applicant fingerprint it was computed from:
+the job's ``applicant_version`` plus the count and a hash of the applicants'
+document ids and resume URLs. ``applicant_version`` lives on the ranking's
+parent document and is bumped (``bump_applicant_version`` or a Firestore
+``Increment`` from whatever writes ``resumes``) whenever applicants change.
+With ``APPLICANT_VERSIONING`` enabled the pipeline trusts that counter and a
+cache hit is validated with the single parent document read. Resumes that
+failed to download or parse are recorded as ``pending``, and a ranking with
+pending resumes is never a cache hit, so they are retried on the next request.
+
+Any client with the ``google.cloud.firestore`` interface works: the real
+client (which honours ``FIRESTORE_EMULATOR_HOST``) or
+``utils.fake_firestore.FakeFirestore``.
+"""
+
+import hashlib
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+try:
+    from google.cloud.firestore import Increment
+except ImportError:  # only the in-memory client is available
+    from utils.fake_firestore import Increment
+
+logger = logging.getLogger(__name__)
+
+APPLICANT_FIELDS = ("resumeURL", "fullName", "email")
+DOCUMENT_ID = "__name__"  # Firestore's field path for the document id
+BATCH_LIMIT = 500  # Firestore's maximum writes per batch
+
+
+class RankingStore:
+    """Reads applicants and reads/writes sharded rankings for jobs"""
+
+    def __init__(self, db, page_size=None, shard_size=None):
+        self.db = db
+        self.page_size = page_size or Config.FIRESTORE_PAGE_SIZE
+        self.shard_size = shard_size or Config.RANKING_SHARD_SIZE
+        self._executor = None
+        self._executor_pid = None
+
+    def _pool(self):
+        # Threads do not survive gunicorn's fork, so each worker builds its own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="firestore")
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def _ranking_ref(self, job_id):
+        return self.db.collection("resume_rankings").document(job_id)
+
+    def _shard_ref(self, job_id, index):
+        return self._ranking_ref(job_id).collection("shards").document(f"{index:04d}")
+
+    def iter_applicants(self, job_id, fields=APPLICANT_FIELDS):
+        """Yield projected applicant snapshots for a job, one page at a time"""
+        query = self.db.collection("resumes").where("jobId", "==", job_id) \
+            .select(list(fields)).order_by(DOCUMENT_ID).limit(self.page_size)
+        cursor = None
+        while True:
+            page = list((query.start_after(cursor) if cursor is not None else query).stream())
+            yield from page
+            if len(page) < self.page_size:
+                return
+            cursor = page[-1]
+
+    def load_applicants(self, job_id):
+        """Return the job's applicants and their fingerprint (``count`` and ``hash``)"""
+        applicants, keys = [], []
+        for doc in self.iter_applicants(job_id):
+            applicant = doc.to_dict()
+            applicants.append(applicant)
+            keys.append(f"{doc.id}\t{applicant.get('resumeURL') or ''}")
+        digest = hashlib.sha256("\n".join(sorted(keys)).encode("utf-8")).hexdigest()
+        return applicants, {"count": len(applicants), "hash": digest}
+
+    def ranking_meta(self, job_id):
+        """Return the ranking's parent document (one read), or None"""
+        snapshot = self._ranking_ref(job_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def load_ranking(self, job_id, parent=None):
+        """
+        Return the stored ranking as a dict with ``ranked_resumes``,
+        ``raw_scores``, ``top_score``, ``job`` and ``fingerprint``, or None.
+
+        Pass the ``parent`` document if it was already read.
+        """
+        for _ in range(2):
+            parent = parent or self.ranking_meta(job_id)
+            if parent is None or ("shard_count" not in parent and "ranked_resumes" not in parent):
+                return None
+            if "shard_count" not in parent:
+                # Stored inline before rankings were sharded
+                return parent
+
+            refs = [self._shard_ref(job_id, i) for i in range(parent["shard_count"])]
+            shards = {doc.id: doc.to_dict() for doc in self.db.get_all(refs) if doc.exists}
+            ranked, raw_scores = [], []
+            for ref in refs:
+                shard = shards.get(ref.id)
+                if shard is None or shard.get("generation") != parent["generation"]:
+                    break
+                ranked.extend(shard["ranked_resumes"])
+                raw_scores.extend(shard["raw_scores"])
+            else:
+                parent["ranked_resumes"] = ranked
+                parent["raw_scores"] = raw_scores
+                return parent
+            # A newer ranking was being written while we read; read it again
+            logger.info(f"Ranking for job {job_id} changed while reading, retrying")
+            parent = None
+        return None
+
+    def load(self, job_id):
+        """
+        Load ``(applicants, fingerprint, ranking)`` with the applicant query and
+        the ranking lookup in flight at once.
+        """
+        pool = self._pool()
+        applicants = pool.submit(self.load_applicants, job_id)
+        ranking = pool.submit(self.load_ranking, job_id)
+        return applicants.result() + (ranking.result(),)
+
+    def bump_applicant_version(self, job_id):
+        """Mark the job's applicants as changed so its stored ranking is revalidated"""
+        self._ranking_ref(job_id).set({"applicant_version": Increment(1)}, merge=True)
+
+    def save_ranking(self, job_id, ranked_resumes, raw_scores, top_score, job, fingerprint=None, pending=None,
+                     previous=None):
+        """
+        Write a ranking as a parent document plus shards.
+
+        ``fingerprint`` identifies the applicants the ranking was computed
+        from. ``pending`` lists resume URLs that could not be processed; while
+        any are recorded the ranking is not reused as is. ``previous`` is the
+        ranking this one replaces, if it was loaded; its surplus shards are
+        deleted.
+        """
+        generation = uuid.uuid4().hex
+        shard_count = max(1, -(-len(ranked_resumes) // self.shard_size))
+        writes = []
+        for i in range(shard_count):
+            start, stop = i * self.shard_size, (i + 1) * self.shard_size
+            writes.append(("set", self._shard_ref(job_id, i), {
+                "generation": generation,
+                "ranked_resumes": ranked_resumes[start:stop],
+                "raw_scores": raw_scores[start:stop],
+            }))
+        # The parent goes last so readers never see it before its shards. It is
+        # merged so a concurrent applicant_version bump is kept, except over an
+        # inline ranking from an earlier version, which is replaced outright.
+        parent = {
+            "generation": generation,
+            "shard_count": shard_count,
+            "count": len(ranked_resumes),
+            "top_score": top_score,
+            "job": job,
+            "fingerprint": fingerprint,
+            "pending": list(pending or []),
+        }
+        inline = previous is not None and "shard_count" not in previous
+        if inline:
+            parent["applicant_version"] = previous.get("applicant_version", 0)
+        writes.append(("replace" if inline else "merge", self._ranking_ref(job_id), parent))
+        for i in range(shard_count, (previous or {}).get("shard_count", 0)):
+            writes.append(("delete", self._shard_ref(job_id, i), None))
+
+        for start in range(0, len(writes), BATCH_LIMIT):
+            batch = self.db.batch()
+            for op, ref, data in writes[start:start + BATCH_LIMIT]:
+                if op == "delete":
+                    batch.delete(ref)
+                else:
+                    batch.set(ref, data, merge=op == "merge")
+            batch.commit()
+        logger.info(f"Stored ranking for job {job_id} in {shard_count} shard(s)")
@@ -0,0 +1,129 @@
+"""
+Batched embedding engine around the SentenceTransformer encoder.
+
+Inputs are sorted by length before batching so each batch pads to similar
+lengths, encoded with a configurable batch size and maximum sequence length,
+and returned as L2-normalised float32 vectors in input order. Because the
+vectors have unit length, cosine similarity is a plain dot product.
+
+With ``EMBED_CHUNKED`` enabled, ``encode_documents`` splits long texts into
+token windows instead of letting the encoder truncate them, embeds every
+window of every document in one flat batch and mean-pools the windows back
+into one vector per document. ``EMBED_MAX_CHUNKS`` caps the windows per
+document so the cost stays bounded.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingEngine:
+    """Encodes texts into unit-length float32 vectors"""
+
+    def __init__(self, model, batch_size=None, max_seq_length=None,
+                 chunked=None, chunk_stride=None, max_chunks=None):
+        self.model = model
+        self.batch_size = batch_size or Config.EMBED_BATCH_SIZE
+        self.chunked = Config.EMBED_CHUNKED if chunked is None else chunked
+        self.chunk_stride = chunk_stride or Config.EMBED_CHUNK_STRIDE
+        self.max_chunks = max_chunks or Config.EMBED_MAX_CHUNKS
+        self.stats = {"documents": 0, "chunks": 0, "capped_documents": 0, "seconds": 0.0}
+        # Request threads encode concurrently; the totals are updated under this lock
+        self._stats_lock = threading.Lock()
+        self.last_stats = {}
+        max_seq_length = max_seq_length or Config.EMBED_MAX_SEQ_LENGTH
+        if max_seq_length:
+            model.max_seq_length = max_seq_length
+        logger.info(f"Embedding engine: batch_size={self.batch_size}, "
+                    f"max_seq_length={model.max_seq_length}, chunked={self.chunked}")
+
+    @property
+    def dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts):
+        """Return an ``(len(texts), dimension)`` float32 array of unit vectors"""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        # Longest first, so the first batch reveals any memory problem early
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        encoded = self.model.encode(
+            [texts[i] for i in order],
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        embeddings = np.empty_like(encoded, dtype=np.float32)
+        embeddings[order] = encoded
+        return embeddings
+
+    def encode_documents(self, texts):
+        """Embed whole documents, chunking them if chunked mode is enabled"""
+        started = time.perf_counter()
+        if self.chunked:
+            embeddings = self.encode_chunked(texts)
+        else:
+            embeddings = self.encode(texts)
+        # Counted here so the totals cover both paths
+        with self._stats_lock:
+            self.stats["documents"] += len(texts)
+            self.stats["seconds"] += time.perf_counter() - started
+        return embeddings
+
+    def _windows(self, text):
+        tokenizer = self.model.tokenizer
+        ids = tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"]
+        # Leave room for the [CLS]/[SEP] tokens the encoder adds back
+        size = self.model.max_seq_length - 2
+        stride = min(self.chunk_stride or size, size)
+        windows = []
+        for start in range(0, max(len(ids), 1), stride):
+            windows.append(ids[start:start + size])
+            if start + size >= len(ids):
+                break
+        capped = len(windows) > self.max_chunks
+        return [tokenizer.decode(w) for w in windows[:self.max_chunks]], capped
+
+    def encode_chunked(self, texts):
+        """Embed each text as the mean of its token-window embeddings"""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        started = time.perf_counter()
+        chunks, owners, capped = [], [], 0
+        for i, text in enumerate(texts):
+            windows, was_capped = self._windows(text)
+            chunks.extend(windows)
+            owners.extend([i] * len(windows))
+            capped += was_capped
+
+        vectors = self.encode(chunks)
+        owners = np.asarray(owners)
+        pooled = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+        np.add.at(pooled, owners, vectors)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        pooled /= np.where(norms == 0, 1, norms)
+
+        seconds = time.perf_counter() - started
+        counts = np.bincount(owners, minlength=len(texts))
+        last = {
+            "documents": len(texts),
+            "chunks": len(chunks),
+            "max_chunks_per_document": int(counts.max()),
+            "capped_documents": capped,
+            "seconds": round(seconds, 3),
+        }
+        with self._stats_lock:
+            for key in ("chunks", "capped_documents"):
+                self.stats[key] += last[key]
+            self.last_stats = last
+        logger.info(f"Chunked embedding: {len(texts)} documents, {len(chunks)} chunks "
+                    f"({capped} capped) in {seconds:.2f}s")
+        return pooled
@@ -0,0 +1,229 @@
+"""
+Selectable CPU inference backends for the sentence encoder.
+
+``SENTENCE_TRANSFORMER_BACKEND`` picks one of:
+
+- ``torch``: the stock fp32 SentenceTransformer (default)
+- ``torch-int8``: the same model with its Linear layers dynamically
+  quantized to int8
+- ``onnx``: the transformer exported to ONNX and run with ONNX Runtime
+- ``onnx-int8``: the ONNX export with dynamically quantized int8 weights
+
+Model files are cached in ``MODEL_CACHE_DIR``; with ``MODELS_OFFLINE`` the
+Hugging Face libraries only read that cache and never reach the network.
+The ONNX backends export the model once into ``ONNX_CACHE_DIR`` and
+afterwards only need ``onnxruntime`` and the tokenizer at load time, so a
+worker no longer holds the torch model in memory. Every backend exposes the
+subset of the SentenceTransformer interface that ``EmbeddingEngine`` uses.
+
+Run ``python -m utils.encoder_backends <backend>`` to compare a backend's
+ranking order against the fp32 baseline on ``fixtures/fidelity.json``.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+# Must run before transformers or huggingface_hub are first imported
+def _configure_hub():
+    if Config.MODELS_OFFLINE:
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+
+# Load the sentence encoder for the configured backend
+def load_encoder(name=None, backend=None, num_threads=None):
+    name = name or Config.SENTENCE_TRANSFORMER_MODEL
+    backend = backend or Config.SENTENCE_TRANSFORMER_BACKEND
+    num_threads = num_threads or Config.TORCH_NUM_THREADS
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    _configure_hub()
+
+    if backend.startswith("onnx"):
+        return OnnxEncoder(name, quantized=backend == "onnx-int8", num_threads=num_threads)
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if num_threads:
+        # Intra-op threads are per process, i.e. per gunicorn worker
+        torch.set_num_threads(num_threads)
+    model = SentenceTransformer(name, device="cpu", cache_folder=Config.MODEL_CACHE_DIR)
+    if backend == "torch-int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+# Wrap the HF model so the exported graph returns only the token embeddings
+def _token_embedding_module(auto_model):
+    import torch
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    return TokenEmbeddings(auto_model)
+
+
+# Export the transformer to ONNX (and optionally int8) once per model
+def export_onnx(name, directory, quantized=False):
+    fp32_path = os.path.join(directory, "model.onnx")
+    int8_path = os.path.join(directory, "model-int8.onnx")
+    os.makedirs(directory, exist_ok=True)
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        st = SentenceTransformer(name, device="cpu", cache_folder=Config.MODEL_CACHE_DIR)
+        pooling = st[1].get_pooling_mode_str() if len(st) > 1 else "mean"
+        if pooling != "mean":
+            raise ValueError(f"ONNX backend only supports mean pooling, {name} uses {pooling}")
+        tokenizer = st.tokenizer
+        dummy = tokenizer(["warm up"], return_tensors="pt")
+        axes = {0: "batch", 1: "sequence"}
+        torch.onnx.export(
+            _token_embedding_module(st[0].auto_model.eval()),
+            (dummy["input_ids"], dummy["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["token_embeddings"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_embeddings": axes},
+            opset_version=14,
+        )
+        tokenizer.save_pretrained(directory)
+        with open(os.path.join(directory, "encoder.json"), "w") as f:
+            json.dump({"name": name, "max_seq_length": st.max_seq_length,
+                       "dimension": st.get_sentence_embedding_dimension()}, f)
+        logger.info(f"Exported {name} to {fp32_path}")
+
+    if quantized and not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        logger.info(f"Quantized {fp32_path} to {int8_path}")
+
+    return int8_path if quantized else fp32_path
+
+
+class OnnxEncoder:
+    """Mean-pooled sentence encoder running on ONNX Runtime"""
+
+    def __init__(self, name, quantized=False, num_threads=None, cache_dir=None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx encoder backends require the onnxruntime package") from e
+        from transformers import AutoTokenizer
+
+        directory = os.path.join(cache_dir or Config.ONNX_CACHE_DIR, name.replace("/", "__"))
+        path = export_onnx(name, directory, quantized=quantized)
+        with open(os.path.join(directory, "encoder.json")) as f:
+            meta = json.load(f)
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.max_seq_length = meta["max_seq_length"]
+        self._dimension = meta["dimension"]
+
+    def get_sentence_embedding_dimension(self):
+        return self._dimension
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, convert_to_numpy=True,
+               show_progress_bar=False):
+        outputs = []
+        for start in range(0, len(sentences), batch_size):
+            batch = self.tokenizer(sentences[start:start + batch_size], padding=True, truncation=True,
+                                   max_length=self.max_seq_length, return_tensors="np")
+            mask = batch["attention_mask"].astype(np.int64)
+            (tokens,) = self.session.run(None, {
+                "input_ids": batch["input_ids"].astype(np.int64),
+                "attention_mask": mask,
+            })
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (tokens * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            outputs.append(pooled.astype(np.float32))
+        embeddings = np.vstack(outputs) if outputs else np.zeros((0, self._dimension), dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.where(norms == 0, 1, norms)
+        return embeddings
+
+
+# Rank order of resumes for each job by cosine similarity
+def _rankings(encoder, jobs, resumes):
+    from utils.embedding import EmbeddingEngine
+    from utils.resume_utils import preprocess_text
+
+    engine = EmbeddingEngine(encoder)
+    resume_vectors = engine.encode([preprocess_text(r) for r in resumes])
+    job_vectors = engine.encode([preprocess_text(j) for j in jobs])
+    similarities = job_vectors @ resume_vectors.T
+    return np.argsort(-similarities, axis=1, kind="stable"), resume_vectors
+
+
+# Spearman correlation between two rank orders of the same items
+def _spearman(order_a, order_b):
+    n = len(order_a)
+    if n < 2:
+        return 1.0
+    rank_a = np.empty(n)
+    rank_b = np.empty(n)
+    rank_a[order_a] = np.arange(n)
+    rank_b[order_b] = np.arange(n)
+    return float(1 - 6 * np.sum((rank_a - rank_b) ** 2) / (n * (n ** 2 - 1)))
+
+
+def check_fidelity(backend, fixture_path=None, top_k=3):
+    """
+    Compare the ranking order of ``backend`` against the torch fp32 baseline.
+
+    Returns per-job Spearman correlations and top-k overlaps plus the mean
+    cosine similarity between baseline and candidate resume embeddings.
+    """
+    fixture_path = fixture_path or os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                                "fixtures", "fidelity.json")
+    with open(fixture_path) as f:
+        fixture = json.load(f)
+    jobs, resumes = fixture["jobs"], fixture["resumes"]
+
+    baseline_order, baseline_vectors = _rankings(load_encoder(backend="torch"), jobs, resumes)
+    candidate_order, candidate_vectors = _rankings(load_encoder(backend=backend), jobs, resumes)
+
+    spearman = [_spearman(a, b) for a, b in zip(baseline_order, candidate_order)]
+    overlap = [len(set(a[:top_k]) & set(b[:top_k])) / top_k for a, b in zip(baseline_order, candidate_order)]
+    cosine = float(np.mean(np.sum(baseline_vectors * candidate_vectors, axis=1)))
+    return {
+        "backend": backend,
+        "spearman": spearman,
+        "min_spearman": min(spearman),
+        f"top{top_k}_overlap": overlap,
+        "mean_embedding_cosine": cosine,
+        "passed": min(spearman) >= Config.ENCODER_FIDELITY_MIN_SPEARMAN,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    result = check_fidelity(sys.argv[1] if len(sys.argv) > 1 else "onnx-int8")
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["passed"] else 1)
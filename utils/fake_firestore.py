@@ -0,0 +1,244 @@
+"""
+In-memory stand-in for the Firestore client.
+
+Implements the subset of the ``google.cloud.firestore`` interface this app
+uses (collections, documents, subcollections, ``where``/``select``/
+``order_by``/``limit``/``start_after`` queries, batched writes, transactions,
+``get_all`` and ``Increment``), so the data layer and the ranking pipeline can run without
+credentials. Stored data is deep-copied on every read and write, like a round
+trip through the real client. ``stats`` counts document reads and writes.
+
+For the real wire protocol, point the real client at the Firestore emulator
+by setting ``FIRESTORE_EMULATOR_HOST`` instead.
+"""
+
+import copy
+import threading
+import uuid
+
+DOCUMENT_ID = "__name__"
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+class Increment:
+    """Server-side numeric increment, as ``google.cloud.firestore.Increment``"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class FakeDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name):
+        return FakeCollection(self._client, self.path + (name,))
+
+    def get(self, transaction=None):
+        return self._client._read(self)
+
+    def set(self, data, merge=False):
+        self._client._write(self, data, merge=merge)
+
+    def update(self, data):
+        if self._client._read(self, count=False)._data is None:
+            raise KeyError(f"No document to update: {'/'.join(self.path)}")
+        self._client._write(self, data, merge=True)
+
+    def delete(self):
+        self._client._delete(self)
+
+
+class FakeQuery:
+    def __init__(self, client, path, filters=(), fields=None, orders=(), limit=None, cursor=None):
+        self._client = client
+        self._path = path
+        self._filters = filters
+        self._fields = fields
+        self._orders = orders
+        self._limit = limit
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, fields=self._fields, orders=self._orders,
+                     limit=self._limit, cursor=self._cursor)
+        state.update(changes)
+        return FakeQuery(self._client, self._path, **state)
+
+    def where(self, field, op, value):
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported operator '{op}'")
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def select(self, field_paths):
+        return self._copy(fields=tuple(field_paths))
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(orders=self._orders + ((field, direction == "DESCENDING"),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, snapshot):
+        return self._copy(cursor=snapshot)
+
+    def _sort_key(self, field, ref, data):
+        return ref.id if field == DOCUMENT_ID else data.get(field)
+
+    def stream(self):
+        docs = [(ref, data) for ref, data in self._client._children(self._path)
+                if all(_OPERATORS[op](data.get(field), value) for field, op, value in self._filters)]
+        orders = self._orders or ((DOCUMENT_ID, False),)
+        for field, descending in reversed(orders):
+            docs.sort(key=lambda item: self._sort_key(field, *item), reverse=descending)
+        if self._cursor is not None:
+            keys = [self._sort_key(field, self._cursor.reference, self._cursor._data or {}) for field, _ in orders]
+            position = next((i for i, (ref, data) in enumerate(docs)
+                             if [self._sort_key(field, ref, data) for field, _ in orders] == keys), None)
+            docs = docs[position + 1:] if position is not None else docs
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        for ref, data in docs:
+            self._client.stats["reads"] += 1
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            yield FakeSnapshot(ref, copy.deepcopy(data))
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path[-1]
+
+    def document(self, document_id=None):
+        return FakeDocumentReference(self._client, self._path + (document_id or uuid.uuid4().hex,))
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(lambda: self._client._write(ref, data, merge=merge))
+
+    def update(self, ref, data):
+        self._ops.append(lambda: ref.update(data))
+
+    def delete(self, ref):
+        self._ops.append(lambda: self._client._delete(ref))
+
+    def commit(self):
+        if len(self._ops) > 500:
+            raise ValueError("A batch can contain at most 500 writes")
+        # Applied under the client lock so readers never see half a batch
+        with self._client._lock:
+            for op in self._ops:
+                op()
+        self._ops = []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Writes are buffered and applied when the transactional function returns"""
+
+    def get(self, ref):
+        return self._client._read(ref)
+
+
+def transactional(fn):
+    """
+    As ``google.cloud.firestore.transactional``: ``fn(transaction, ...)`` runs
+    under the client lock, so no other write interleaves, and never retries.
+    """
+    def run(transaction, *args, **kwargs):
+        with transaction._client._lock:
+            result = fn(transaction, *args, **kwargs)
+            transaction.commit()
+        return result
+    return run
+
+
+class FakeFirestore:
+    """Thread-safe in-memory database keyed by document path"""
+
+    def __init__(self):
+        self._docs = {}
+        self._lock = threading.RLock()
+        self.stats = {"reads": 0, "writes": 0}
+
+    def collection(self, name):
+        return FakeCollection(self, (name,))
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    def get_all(self, references):
+        for ref in references:
+            yield self._read(ref)
+
+    def _children(self, path):
+        with self._lock:
+            return [(FakeDocumentReference(self, key), data) for key, data in self._docs.items()
+                    if len(key) == len(path) + 1 and key[:-1] == path]
+
+    def _read(self, ref, count=True):
+        with self._lock:
+            if count:
+                self.stats["reads"] += 1
+            return FakeSnapshot(ref, copy.deepcopy(self._docs.get(ref.path)))
+
+    def _write(self, ref, data, merge=False):
+        with self._lock:
+            self.stats["writes"] += 1
+            current = self._docs.get(ref.path) if merge else None
+            document = dict(current or {})
+            for field, value in data.items():
+                if isinstance(value, Increment):
+                    value = (document.get(field) or 0) + value.value
+                document[field] = copy.deepcopy(value)
+            self._docs[ref.path] = document
+
+    def _delete(self, ref):
+        with self._lock:
+            self.stats["writes"] += 1
+            self._docs.pop(ref.path, None)
@@ -0,0 +1,168 @@
+"""
+On-disk per-resume feature store.
+
+Features derived from a resume (extracted text, cleaned text, embedding,
+skills, qualifications and work periods) are stored in a local SQLite
+database keyed by resume URL plus a hash of the PDF bytes. Gunicorn workers
+on the same host share the file, so a resume is only parsed and embedded
+once until its content changes or the entry is evicted. The store is bounded
+by ``FEATURE_STORE_MAX_MB``; least recently used entries are evicted first.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from config import Config
+from utils.skill_matcher import extraction_version
+
+logger = logging.getLogger(__name__)
+
+# Entries written under a different model configuration are treated as misses
+FEATURE_VERSION = "|".join([
+    "periods-v2",  # work periods stored as [start, end] month indices
+    "skills-v2",  # normalized skills keep + and # as words
+    Config.SENTENCE_TRANSFORMER_MODEL,
+    Config.SENTENCE_TRANSFORMER_BACKEND,
+    f"unit{Config.EMBED_MAX_SEQ_LENGTH}",
+    f"chunks{Config.EMBED_MAX_CHUNKS}x{Config.EMBED_CHUNK_STRIDE}" if Config.EMBED_CHUNKED else "whole",
+    Config.SPACY_MODEL,
+    ",".join(sorted(Config.SPACY_EXCLUDE)),
+    extraction_version(),
+])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS features (
+    url TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    version TEXT NOT NULL,
+    text TEXT NOT NULL,
+    cleaned TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    skills TEXT NOT NULL,
+    quals TEXT NOT NULL,
+    periods TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (url, content_hash)
+);
+CREATE INDEX IF NOT EXISTS features_last_access ON features (last_access);
+"""
+
+
+# Stable hash of downloaded resume bytes
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class FeatureStore:
+    """SQLite-backed, size-bounded store of per-resume features"""
+
+    def __init__(self, path=Config.FEATURE_STORE_PATH, max_bytes=Config.FEATURE_STORE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url, content_hash):
+        """Return the stored features for this exact resume content, or None"""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT text, cleaned, embedding, skills, quals, periods FROM features "
+            "WHERE url = ? AND content_hash = ? AND version = ?",
+            (url, content_hash, FEATURE_VERSION),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE features SET last_access = ? WHERE url = ? AND content_hash = ?",
+            (time.time(), url, content_hash),
+        )
+        text, cleaned, embedding, skills, quals, periods = row
+        return {
+            "text": text,
+            "cleaned": cleaned,
+            "embedding": np.frombuffer(embedding, dtype=np.float32),
+            "skills": json.loads(skills),
+            "quals": json.loads(quals),
+            "periods": json.loads(periods),
+        }
+
+    def put(self, url, content_hash, features):
+        """Store features for a resume, evicting old entries if over budget"""
+        embedding = np.asarray(features["embedding"], dtype=np.float32).tobytes()
+        skills = json.dumps(features["skills"])
+        quals = json.dumps(features["quals"])
+        periods = json.dumps(features["periods"])
+        size = (len(features["text"]) + len(features["cleaned"]) + len(embedding)
+                + len(skills) + len(quals) + len(periods))
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, content_hash, FEATURE_VERSION, features["text"], features["cleaned"],
+             embedding, skills, quals, periods, size, time.time()),
+        )
+        self._evict()
+
+    def iter_embeddings(self):
+        """Yield ``(url, content_hash, embedding)`` for every current-version entry"""
+        rows = self._conn().execute(
+            "SELECT url, content_hash, embedding FROM features WHERE version = ?", (FEATURE_VERSION,)
+        )
+        for url, digest, embedding in rows:
+            yield url, digest, np.frombuffer(embedding, dtype=np.float32)
+
+    def _evict(self):
+        conn = self._conn()
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM features").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the budget so eviction doesn't run on every insert
+        target = total - int(self.max_bytes * 0.9)
+        freed, evicted = 0, 0
+        rows = conn.execute("SELECT url, content_hash, size FROM features ORDER BY last_access").fetchall()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for url, digest, size in rows:
+                if freed >= target:
+                    break
+                conn.execute("DELETE FROM features WHERE url = ? AND content_hash = ?", (url, digest))
+                freed += size
+                evicted += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Evicted {evicted} resume feature entries ({freed / 1024:.0f} KB)")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store():
+    """Return the per-process feature store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeatureStore()
+    return _store
@@ -0,0 +1,264 @@
+"""
+Concurrent fetch-and-extract stage for resume PDFs.
+
+Downloads are I/O-bound and run on a thread pool sharing one keep-alive HTTP
+session. PDF parsing is CPU-bound (PyPDF2 is pure Python): long PDFs are split
+into page ranges across a separate, smaller process pool, and shorter ones are
+parsed in the download thread, which has already parsed them to count their
+pages (see ``utils.pdf_extract``). ``EXTRACT_WORKERS`` is a budget for the
+host, so each gunicorn worker gets an even share of it, and parses in-thread
+when the share rounds down to nothing. Pool processes come from a forkserver:
+forking the worker itself, with its model and request threads, could leave a
+child holding a lock no thread will release. When a ``lookup`` callable is
+given, each download is hashed and resumes whose features are already known
+skip PDF parsing entirely. The whole stage is bounded by a per-job deadline; resumes
+that fail or miss the deadline are reported with an error instead of holding
+up the rest.
+
+Bodies are streamed into a spooled temporary file and never held whole in
+memory beyond ``DOWNLOAD_SPOOL_KB``. Responses are rejected as early as
+possible: from a non-PDF ``Content-Type`` or a ``Content-Length`` over
+``MAX_DOWNLOAD_BYTES`` before any of the body is read, from the first bytes
+if they are not a PDF header, and as soon as the body passes the cap or
+``REQUEST_TIMEOUT`` elapses. Downloads with validators are kept in the blob
+cache (``utils.blob_cache``) and revalidated with conditional requests.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from utils import metrics
+from utils.blob_cache import get_blob_cache
+from utils.pdf_extract import extract_pdf, pool_size
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Servers label PDFs loosely; anything else (HTML error pages, images) is refused
+PDF_CONTENT_TYPES = ("application/pdf", "application/x-pdf", "application/octet-stream",
+                     "binary/octet-stream", "application/force-download")
+# PDF readers accept the header anywhere in the first kilobyte
+PDF_MAGIC = b"%PDF-"
+MAGIC_WINDOW = 1024
+
+
+class FetchedResume:
+    """Outcome of fetching and extracting a single resume"""
+
+    __slots__ = ("index", "url", "text", "content_hash", "features", "pdf", "error")
+
+    def __init__(self, index, url, text="", error=None):
+        self.index = index
+        self.url = url
+        self.text = text
+        self.content_hash = None
+        self.features = None
+        # PdfExtraction with page and byte counts, when the PDF was parsed
+        self.pdf = None
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+_session = None
+_extract_pool = None
+_pool_lock = threading.Lock()
+
+
+# Shared HTTP session with a connection pool sized for the download workers
+def get_session():
+    global _session
+    if _session is None:
+        with _pool_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=Config.DOWNLOAD_WORKERS,
+                                      pool_maxsize=Config.DOWNLOAD_WORKERS)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+# Long-lived process pool for PDF parsing, created on first use in each worker
+def get_extract_pool():
+    global _extract_pool
+    if _extract_pool is None and pool_size() > 0:
+        with _pool_lock:
+            if _extract_pool is None:
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["utils.pdf_extract"])
+                _extract_pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=context)
+    return _extract_pool
+
+
+def _check_headers(response, max_bytes):
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type and content_type not in PDF_CONTENT_TYPES:
+        raise ValueError(f"not a PDF: Content-Type {content_type}")
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise ValueError(f"resume is {int(length)} bytes, over the {max_bytes} byte limit")
+
+
+def _stream_body(response, out, max_bytes, expires_at):
+    """Copy the body to ``out`` under the byte cap and time budget; returns (size, sha256 hex)"""
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    for chunk in response.iter_content(CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise ValueError(f"resume exceeds the {max_bytes} byte limit")
+        if len(head) < MAGIC_WINDOW:
+            head += chunk[:MAGIC_WINDOW]
+            if len(head) >= MAGIC_WINDOW and PDF_MAGIC not in head:
+                raise ValueError("not a PDF: missing %PDF- header")
+        if time.monotonic() > expires_at:
+            raise ValueError("download exceeded the request timeout")
+        digest.update(chunk)
+        out.write(chunk)
+    if PDF_MAGIC not in head:
+        raise ValueError("not a PDF: missing %PDF- header")
+    return size, digest.hexdigest()
+
+
+def _download(result, session, timeout, blobs, conditional=True):
+    """Download ``result.url``; returns a PDF source for ``extract_pdf`` (a path or a file object)"""
+    max_bytes = Config.MAX_DOWNLOAD_BYTES
+    cached = blobs.get(result.url) if blobs is not None and conditional else None
+    headers = cached.conditional_headers() if cached is not None else None
+    expires_at = time.monotonic() + timeout
+
+    with session.get(result.url, timeout=timeout, stream=True, headers=headers) as response:
+        if response.status_code == 304 and cached is not None:
+            blobs.touch(result.url)
+            result.content_hash = cached.content_hash
+            metrics.inc("downloads_total", outcome="not_modified")
+            return cached.path
+        response.raise_for_status()
+        _check_headers(response, max_bytes)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if blobs is not None and (etag or last_modified):
+            out = blobs.temporary_file()
+            try:
+                with out:
+                    size, result.content_hash = _stream_body(response, out, max_bytes, expires_at)
+                source = blobs.put(result.url, out.name, result.content_hash, etag, last_modified)
+            except BaseException:
+                try:
+                    os.remove(out.name)
+                except FileNotFoundError:
+                    pass
+                raise
+        else:
+            source = tempfile.SpooledTemporaryFile(max_size=Config.DOWNLOAD_SPOOL_KB * 1024)
+            try:
+                size, result.content_hash = _stream_body(response, source, max_bytes, expires_at)
+            except BaseException:
+                source.close()
+                raise
+    metrics.inc("download_bytes_total", size)
+    metrics.inc("downloads_total", outcome="downloaded")
+    return source
+
+
+def _fetch(result, session, timeout, lookup, extract_pool, blobs):
+    try:
+        with metrics.timer("download_seconds"):
+            source = _download(result, session, timeout, blobs)
+    except ValueError:
+        metrics.inc("downloads_total", outcome="rejected")
+        raise
+    try:
+        if lookup is not None:
+            result.features = lookup(result.url, result.content_hash)
+            if result.features is not None:
+                return
+        if isinstance(source, str) and not os.path.exists(source):
+            # Evicted by another worker between the 304 and now; fetch it again in full
+            blobs.forget(result.url)
+            source = _download(result, session, timeout, blobs, conditional=False)
+        # Long PDFs are parsed on the process pool; this thread only waits for them
+        pdf = extract_pdf(source, pool=extract_pool)
+    finally:
+        if not isinstance(source, str):
+            source.close()
+    if not pdf.ok:
+        raise ValueError(f"extract failed: {pdf.error}")
+    if pdf.error:
+        logger.warning(f"Partial text from {result.url}: {pdf.error}")
+    result.text = pdf.text
+    result.pdf = pdf
+    metrics.inc("pdf_pages_total", pdf.pages)
+
+
+def fetch_and_extract(urls, deadline=None, download_workers=None, timeout=None, lookup=None, on_progress=None):
+    """
+    Download and extract text from every URL concurrently.
+
+    Returns one ``FetchedResume`` per URL, in input order. ``deadline`` is the
+    wall-clock budget in seconds for the whole batch. ``lookup(url, hash)``
+    may return previously computed features, which are attached to the
+    result in place of extracted text. ``on_progress(done, total)`` is called
+    whenever a resume finishes, successfully or not.
+    """
+    deadline = Config.RANK_DEADLINE if deadline is None else deadline
+    download_workers = download_workers or Config.DOWNLOAD_WORKERS
+    timeout = timeout or Config.REQUEST_TIMEOUT
+    expires_at = time.monotonic() + deadline
+
+    results = [FetchedResume(i, url) for i, url in enumerate(urls)]
+    if not urls:
+        return results
+
+    session = get_session()
+    extract_pool = get_extract_pool()
+    blobs = get_blob_cache()
+    downloads = ThreadPoolExecutor(max_workers=min(download_workers, len(urls)))
+    pending = {}
+    finished = 0
+
+    try:
+        for result in results:
+            pending[downloads.submit(_fetch, result, session, timeout, lookup, extract_pool, blobs)] = result
+
+        while pending:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = pending.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    result.error = str(e)
+                finished += 1
+                if on_progress is not None:
+                    on_progress(finished, len(urls))
+
+        for future, result in pending.items():
+            future.cancel()
+            result.error = f"exceeded the {deadline:.0f}s job deadline"
+        if pending:
+            logger.warning(f"Deadline reached with {len(pending)} of {len(urls)} resumes unfinished")
+    finally:
+        # Do not wait for stragglers; they finish (or time out) in the background
+        downloads.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -0,0 +1,176 @@
+"""
+Background ranking jobs.
+
+In asynchronous mode ``POST /rank`` only enqueues a ticket and returns. A
+small pool of background threads in each worker runs the ranking pipeline and
+keeps the ticket's progress in the ``rank_jobs/{jobId}`` Firestore document,
+so any gunicorn worker can answer status and result polls.
+
+Requests for a job that already has a queued or running ticket for the same
+description are coalesced onto that ticket. Within a worker this is exact;
+across workers it relies on the status document, and a ticket whose
+heartbeat is older than ``RANK_JOB_STALE_SECONDS`` (e.g. its worker was
+recycled) is taken over by the next request. A running ticket refreshes its
+heartbeat every quarter of that window, so long stages are not mistaken for a
+dead worker.
+
+Every status write is a transaction that first checks the document still
+holds the writer's ticket. A run whose ticket was superseded (by a new
+description or by a takeover) writes nothing more and stops at its next
+progress report, before it can save a ranking over the newer run's.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from utils.pipeline import RankingError
+from utils.ranking import description_hash
+
+try:
+    from google.cloud.firestore import transactional
+except ImportError:  # the in-memory client works without the Firestore SDK
+    from utils.fake_firestore import transactional
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class Superseded(Exception):
+    """Raised into a run whose ticket is no longer the job's current one"""
+
+
+class RankJobQueue:
+    """Runs ranking jobs in background threads and tracks them in Firestore"""
+
+    def __init__(self, db, runner, workers=None):
+        self.db = db
+        # runner(job_id, job_description, progress) -> ranked candidate list
+        self.runner = runner
+        self.workers = workers or Config.RANK_JOB_WORKERS
+        self._executor = None
+        self._executor_pid = None
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def _status_ref(self, job_id):
+        return self.db.collection("rank_jobs").document(job_id)
+
+    def _pool(self):
+        # Threads do not survive gunicorn's fork, so each worker builds its own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rank-job")
+            self._executor_pid = os.getpid()
+            self._active = {}
+        return self._executor
+
+    def status(self, job_id):
+        """Return the status document for a job, or None if it was never queued"""
+        snapshot = self._status_ref(job_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def submit(self, job_id, job_description):
+        """
+        Queue a ranking job unless an equivalent one is already active.
+
+        Returns ``(status, coalesced)``.
+        """
+        digest = description_hash(job_description)
+        with self._lock:
+            pool = self._pool()
+            active = self._active.get(job_id)
+            if active is not None and active["description_hash"] == digest:
+                return self.status(job_id) or active, True
+
+            current = self.status(job_id)
+            if current and current.get("status") in ACTIVE_STATUSES \
+                    and current.get("description_hash") == digest \
+                    and time.time() - current.get("updated_at", 0) < Config.RANK_JOB_STALE_SECONDS:
+                return current, True
+
+            now = time.time()
+            ticket = {
+                "ticket": uuid.uuid4().hex,
+                "jobId": job_id,
+                "status": "queued",
+                "stage": None,
+                "done": 0,
+                "total": 0,
+                "description_hash": digest,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            self._status_ref(job_id).set(ticket)
+            self._active[job_id] = ticket
+            pool.submit(self._run, job_id, job_description, ticket)
+            logger.info(f"Queued ranking job {ticket['ticket']} for job ID: {job_id}")
+            return ticket, False
+
+    def _update(self, ref, ticket, fields):
+        """Write ``fields`` to the status document if it still holds ``ticket``; False if superseded"""
+        @transactional
+        def apply(transaction):
+            snapshot = ref.get(transaction=transaction)
+            if not snapshot.exists or snapshot.get("ticket") != ticket["ticket"]:
+                return False
+            transaction.update(ref, fields)
+            return True
+
+        return apply(self.db.transaction())
+
+    def _heartbeat(self, ref, ticket, stop, superseded):
+        while not stop.wait(Config.RANK_JOB_STALE_SECONDS / 4):
+            try:
+                if not self._update(ref, ticket, {"updated_at": time.time()}):
+                    superseded.set()
+                    return
+            except Exception as e:
+                logger.warning(f"Heartbeat failed for ranking job {ticket['ticket']}: {e}")
+
+    def _run(self, job_id, job_description, ticket):
+        ref = self._status_ref(job_id)
+        last_write = [0.0, None]
+        stop, superseded = threading.Event(), threading.Event()
+
+        def progress(stage, done=0, total=0):
+            if superseded.is_set():
+                raise Superseded()
+            now = time.time()
+            # Throttle status writes, but always record a stage change
+            if stage == last_write[1] and now - last_write[0] < 1.0:
+                return
+            last_write[0], last_write[1] = now, stage
+            if not self._update(ref, ticket, {"status": "running", "stage": stage, "done": done, "total": total,
+                                              "updated_at": now}):
+                superseded.set()
+                raise Superseded()
+
+        heartbeat = threading.Thread(target=self._heartbeat, args=(ref, ticket, stop, superseded),
+                                     name="rank-job-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            ranked = self.runner(job_id, job_description, progress)
+            if self._update(ref, ticket, {"status": "done", "stage": None, "count": len(ranked),
+                                          "updated_at": time.time()}):
+                logger.info(f"Ranking job {ticket['ticket']} finished for job ID: {job_id}")
+        except Superseded:
+            logger.info(f"Ranking job {ticket['ticket']} superseded for job ID: {job_id}, stopped")
+        except RankingError as e:
+            self._update(ref, ticket, {"status": "failed", "error": e.message, "error_status": e.status_code,
+                                       "updated_at": time.time()})
+        except Exception as e:
+            logger.error(f"Ranking job {ticket['ticket']} failed: {e}")
+            self._update(ref, ticket, {"status": "failed",
+                                       "error": "Internal server error occurred while ranking resumes",
+                                       "error_status": 500, "updated_at": time.time()})
+        finally:
+            stop.set()
+            with self._lock:
+                if self._active.get(job_id) is ticket:
+                    del self._active[job_id]
@@ -0,0 +1,340 @@
+"""
+Process-local metrics with a Prometheus text endpoint aggregated across workers.
+
+Code on the hot path records counters (``inc``), histogram observations
+(``observe`` / ``timer``) and gauges (``set_gauge``) into plain dicts under
+a lock. Each gunicorn worker writes a snapshot of its metrics to
+``METRICS_DIR/metrics-<pid>.json`` at most every ``METRICS_FLUSH_SECONDS``, and
+``/metrics`` merges the files of all workers: counters and histograms are
+summed and gauges are reported per live worker with a ``pid`` label. The
+counts of workers that have exited (recycled after ``max_requests``) are
+folded into ``metrics-archive.json`` and their files deleted, so counters never
+go backwards and the directory does not grow with every recycled worker; a
+process that finds a file left under its own pid by a dead one archives it
+before writing its own. The master clears the directory on start. With
+``METRICS_DIR`` empty only the serving process is reported.
+
+Values that other modules already count, such as cache hits or model load
+times, are pulled in at flush time by collectors registered with
+``register_collector``.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "ml_api_"
+
+# Seconds; covers a cached lookup up to a full ranking near the gunicorn timeout
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# name: (type, help)
+METRICS = {
+    "http_requests_total": ("counter", "HTTP requests by endpoint, method and status"),
+    "http_request_seconds": ("histogram", "HTTP request latency by endpoint"),
+    "rank_results_total": ("counter", "Rankings returned by source (memory, version, fingerprint, computed)"),
+    "rank_stage_seconds": ("histogram", "Time spent in each /rank pipeline stage"),
+    "resume_stage_seconds": ("histogram", "Time spent per feature batch in each resume processing step"),
+    "resumes_total": ("counter", "Resumes seen by the pipeline by outcome"),
+    "download_seconds": ("histogram", "Resume download time"),
+    "download_bytes_total": ("counter", "Resume bytes downloaded"),
+    "downloads_total": ("counter", "Resume downloads by outcome (downloaded, not_modified, rejected)"),
+    "pdf_pages_total": ("counter", "PDF pages parsed"),
+    "cache_events_total": ("counter", "In-process cache events by cache and event"),
+    "embedding_documents_total": ("counter", "Documents embedded by the encoder"),
+    "embedding_seconds_total": ("counter", "Time spent in the encoder"),
+    "embedding_chunks_total": ("counter", "Token windows embedded in chunked mode"),
+    "embedding_capped_documents_total": ("counter", "Documents with more windows than EMBED_MAX_CHUNKS"),
+    "model_load_seconds": ("gauge", "Time taken to load each model"),
+    "startup_phase_seconds": ("gauge", "Time taken by each startup phase, including model warm-up"),
+    "ready": ("gauge", "1 once the worker's models are loaded and warm"),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_gauges = {}
+_collectors = []
+_last_flush = 0.0
+# Whether this process has written its own file yet
+_flushed = False
+
+ARCHIVE = "metrics-archive.json"
+
+
+def _forget_counts():
+    # A forked worker starts from zero; gauges such as model load times still apply to it
+    global _lock, _last_flush, _flushed
+    _lock = threading.Lock()
+    _counters.clear()
+    _histograms.clear()
+    _last_flush = 0.0
+    _flushed = False
+
+
+os.register_at_fork(after_in_child=_forget_counts)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _maybe_flush()
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+                break
+        histogram["sum"] += value
+        histogram["count"] += 1
+    _maybe_flush()
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the duration of the block in histogram ``name``"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def register_collector(collector):
+    """``collector()`` yields ``(name, labels, value)``; counters are set, not added"""
+    _collectors.append(collector)
+
+
+def _collect():
+    for collector in _collectors:
+        try:
+            for name, labels, value in collector():
+                key = _key(name, labels)
+                with _lock:
+                    if METRICS[name][0] == "gauge":
+                        _gauges[key] = value
+                    else:
+                        _counters[key] = value
+        except Exception as e:
+            logger.warning(f"Metrics collector failed: {e}")
+
+
+def snapshot():
+    """This process's metrics in the JSON form written to the metrics directory"""
+    _collect()
+    with _lock:
+        return {
+            "pid": os.getpid(),
+            "counters": [[name, dict(labels), value] for (name, labels), value in _counters.items()],
+            "histograms": [[name, dict(labels), h["buckets"], h["sum"], h["count"]]
+                           for (name, labels), h in _histograms.items()],
+            "gauges": [[name, dict(labels), value] for (name, labels), value in _gauges.items()],
+        }
+
+
+def _write(path, data):
+    temporary = f"{path}.{threading.get_ident()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def flush():
+    """Write this process's snapshot to ``METRICS_DIR`` (atomically)"""
+    global _last_flush, _flushed
+    _last_flush = time.monotonic()
+    if not Config.METRICS_DIR:
+        return
+    os.makedirs(Config.METRICS_DIR, exist_ok=True)
+    path = os.path.join(Config.METRICS_DIR, f"metrics-{os.getpid()}.json")
+    try:
+        if not _flushed and os.path.exists(path):
+            # A dead process had this pid; keep its counts rather than overwrite them
+            _archive([path])
+        _flushed = True
+        _write(path, snapshot())
+    except OSError as e:
+        logger.warning(f"Could not write metrics to {path}: {e}")
+
+
+def start_flushing():
+    """Flush on a timer, for processes such as the model server that record few metrics themselves"""
+    def run():
+        while True:
+            time.sleep(Config.METRICS_FLUSH_SECONDS)
+            flush()
+
+    threading.Thread(target=run, name="metrics-flush", daemon=True).start()
+
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= Config.METRICS_FLUSH_SECONDS:
+        flush()
+
+
+def clear_directory(directory=None):
+    """Remove every worker's metric file; called by the gunicorn master on start"""
+    directory = directory if directory is not None else Config.METRICS_DIR
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith("metrics-"):
+            os.remove(os.path.join(directory, name))
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge_counts(counters, histograms, data):
+    """Add the counters and histograms of a snapshot to ``counters`` and ``histograms``"""
+    for name, labels, value in data["counters"]:
+        key = _key(name, labels)
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, buckets, total, count in data["histograms"]:
+        key = _key(name, labels)
+        merged = histograms.setdefault(key, {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0})
+        merged["buckets"] = [a + b for a, b in zip(merged["buckets"], buckets)]
+        merged["sum"] += total
+        merged["count"] += count
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _archive(paths):
+    """Fold the counts in ``paths`` into the archive file and delete them"""
+    with open(os.path.join(Config.METRICS_DIR, "archive.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            archive_path = os.path.join(Config.METRICS_DIR, ARCHIVE)
+            counters, histograms = {}, {}
+            archived = _read(archive_path)
+            if archived is not None:
+                _merge_counts(counters, histograms, archived)
+            # Another process may have archived some of them while we waited for the lock
+            found = [(path, data) for path, data in ((p, _read(p)) for p in paths) if data is not None]
+            if not found:
+                return
+            for _, data in found:
+                _merge_counts(counters, histograms, data)
+            _write(archive_path, {
+                "pid": None,
+                "counters": [[name, dict(labels), value] for (name, labels), value in counters.items()],
+                "histograms": [[name, dict(labels), h["buckets"], h["sum"], h["count"]]
+                               for (name, labels), h in histograms.items()],
+                "gauges": [],
+            })
+            for path, _ in found:
+                os.remove(path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _snapshots():
+    flush()
+    if not Config.METRICS_DIR:
+        return [snapshot()]
+    snapshots, dead = [], []
+    for name in os.listdir(Config.METRICS_DIR):
+        if name.startswith("metrics-") and name.endswith(".json"):
+            path = os.path.join(Config.METRICS_DIR, name)
+            data = _read(path)
+            if data is None:
+                continue
+            if data["pid"] is not None and not _alive(data["pid"]):
+                dead.append(path)
+            else:
+                snapshots.append(data)
+    if dead:
+        try:
+            _archive(dead)
+        except OSError as e:
+            logger.warning(f"Could not archive metrics of exited workers: {e}")
+        archived = _read(os.path.join(Config.METRICS_DIR, ARCHIVE))
+        snapshots = [data for data in snapshots if data["pid"] is not None]
+        if archived is not None:
+            snapshots.append(archived)
+        # Whatever could not be archived is still counted from its own file
+        snapshots.extend(data for data in map(_read, dead) if data is not None)
+    return snapshots
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+def render():
+    """All workers' metrics in the Prometheus text exposition format"""
+    counters, histograms, gauges = {}, {}, {}
+    for data in _snapshots():
+        _merge_counts(counters, histograms, data)
+        # Gauges describe a process, so only live workers report them
+        if data["pid"] is None or (Config.METRICS_DIR and not _alive(data["pid"])):
+            continue
+        for name, labels, value in data["gauges"]:
+            gauges[_key(name, dict(labels, pid=data["pid"]))] = value
+
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        full = PREFIX + name
+        series = {"counter": counters, "gauge": gauges, "histogram": histograms}[kind]
+        entries = sorted((labels, value) for (metric, labels), value in series.items() if metric == name)
+        if not entries:
+            continue
+        lines.append(f"# HELP {full} {description}")
+        lines.append(f"# TYPE {full} {kind}")
+        for labels, value in entries:
+            labels = dict(labels)
+            if kind != "histogram":
+                lines.append(f"{full}{_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, value["buckets"]):
+                cumulative += count
+                lines.append(f"{full}_bucket{_labels(dict(labels, le=bound))} {cumulative}")
+            lines.append(f"{full}_bucket{_labels(dict(labels, le='+Inf'))} {value['count']}")
+            lines.append(f"{full}_sum{_labels(labels)} {value['sum']}")
+            lines.append(f"{full}_count{_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
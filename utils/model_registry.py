@@ -0,0 +1,202 @@
+"""
+Process-wide registry for the spaCy and SentenceTransformer models.
+
+Every extraction function in ``utils.resume_utils`` pulls its models from the
+registry returned by ``get_registry()``, so each worker process loads the
+(large) models exactly once no matter how many resumes it ranks.
+
+Ranking code talks to the models through ``get_inference()``. In-process
+this is a thin wrapper around the registry; with ``MODEL_SERVER_SOCKET`` set
+it is a client of the shared model server (``utils.model_server``) and the
+worker never loads the models itself.
+"""
+
+import logging
+import resource
+import threading
+import time
+
+from config import Config
+from utils import metrics
+from utils.embedding import EmbeddingEngine
+from utils.encoder_backends import load_encoder
+
+logger = logging.getLogger(__name__)
+
+
+# Current resident set size of this process in MB
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best we can do without /proc (reported in KB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ModelRegistry:
+    """Lazily loads and caches the NLP models for the current process"""
+
+    def __init__(self, spacy_model=Config.SPACY_MODEL, sentence_model=Config.SENTENCE_TRANSFORMER_MODEL,
+                 encoder_backend=Config.SENTENCE_TRANSFORMER_BACKEND):
+        self.spacy_model = spacy_model
+        self.sentence_model = sentence_model
+        self.encoder_backend = encoder_backend
+        self._nlp = None
+        self._encoder = None
+        self._engine = None
+        self._skill_matcher = None
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            with self._lock:
+                if self._nlp is None:
+                    self._nlp = self._timed("spacy", self._load_spacy)
+        return self._nlp
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            with self._lock:
+                if self._encoder is None:
+                    self._encoder = self._timed("sentence_transformer", self._load_encoder)
+        return self._encoder
+
+    @property
+    def engine(self):
+        """Batched embedding engine wrapping the encoder"""
+        if self._engine is None:
+            encoder = self.encoder
+            with self._lock:
+                if self._engine is None:
+                    self._engine = EmbeddingEngine(encoder)
+        return self._engine
+
+    @property
+    def skill_matcher(self):
+        """Compiled taxonomy matcher sharing the spaCy tokenizer"""
+        if self._skill_matcher is None:
+            nlp = self.nlp
+            with self._lock:
+                if self._skill_matcher is None:
+                    from utils.skill_matcher import SkillMatcher
+                    self._skill_matcher = SkillMatcher(nlp)
+        return self._skill_matcher
+
+    def load(self):
+        """Load every model up front and return the registry"""
+        self.nlp
+        self.engine
+        if Config.SKILL_EXTRACTION_MODE == "taxonomy":
+            self.skill_matcher
+        return self
+
+    def _load_spacy(self):
+        # Imported here so processes that never touch spaCy (e.g. behind a model server) skip it
+        import spacy
+
+        if Config.SKILL_EXTRACTION_MODE == "taxonomy":
+            # The matcher only needs the tokenizer, which is the language's default
+            return spacy.blank(self.spacy_model.split("_")[0])
+        try:
+            return spacy.load(self.spacy_model, exclude=Config.SPACY_EXCLUDE)
+        except OSError as e:
+            # Never download at boot; the model belongs in the image
+            raise OSError(f"spaCy model {self.spacy_model} is not installed; "
+                          f"run 'python -m utils.startup prefetch' when building the image") from e
+
+    def _load_encoder(self):
+        return load_encoder(self.sentence_model, self.encoder_backend)
+
+    def _timed(self, name, loader):
+        rss_before = current_rss_mb()
+        started = time.perf_counter()
+        obj = loader()
+        seconds = time.perf_counter() - started
+        rss_delta = current_rss_mb() - rss_before
+        self.stats[name] = {
+            "load_seconds": round(seconds, 3),
+            "rss_delta_mb": round(rss_delta, 1),
+        }
+        if name == "sentence_transformer":
+            self.stats[name]["backend"] = self.encoder_backend
+        logger.info(f"Loaded {name} model in {seconds:.2f}s (+{rss_delta:.0f} MB RSS)")
+        return obj
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the per-process model registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+class LocalInference:
+    """Runs embedding and skill extraction on this process's registry"""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def load(self):
+        self.registry.load()
+        return self
+
+    def encode(self, texts):
+        return self.registry.engine.encode(texts)
+
+    def encode_documents(self, texts):
+        return self.registry.engine.encode_documents(texts)
+
+    def extract_skills(self, texts):
+        from utils.resume_utils import extract_skills_batch, extract_skills_taxonomy
+        if Config.SKILL_EXTRACTION_MODE == "taxonomy":
+            return extract_skills_taxonomy(texts, self.registry.skill_matcher)
+        return extract_skills_batch(texts, self.registry.nlp)
+
+    def stats(self):
+        return {"models": self.registry.stats, "embedding": self.registry.engine.stats}
+
+
+def _model_metrics():
+    if _registry is None:
+        return
+    for name, stats in _registry.stats.items():
+        yield "model_load_seconds", {"model": name}, stats["load_seconds"]
+    if _registry._engine is not None:
+        stats = _registry._engine.stats
+        yield "embedding_documents_total", {}, stats["documents"]
+        yield "embedding_seconds_total", {}, stats["seconds"]
+        yield "embedding_chunks_total", {}, stats["chunks"]
+        yield "embedding_capped_documents_total", {}, stats["capped_documents"]
+
+
+metrics.register_collector(_model_metrics)
+
+
+_inference = None
+_inference_lock = threading.Lock()
+
+
+def get_inference():
+    """Return the inference backend for this process (local models or the model server)"""
+    global _inference
+    if _inference is None:
+        with _inference_lock:
+            if _inference is None:
+                if Config.MODEL_SERVER_SOCKET:
+                    from utils.model_server import ModelClient
+                    _inference = ModelClient(Config.MODEL_SERVER_SOCKET)
+                else:
+                    _inference = LocalInference(get_registry())
+    return _inference
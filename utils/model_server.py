@@ -0,0 +1,228 @@
+"""
+Shared in-host model server.
+
+One process owns the sentence encoder and the spaCy pipeline and serves all
+gunicorn workers over a Unix socket (``MODEL_SERVER_SOCKET``). Requests of
+the same kind arriving from different workers within
+``MODEL_SERVER_BATCH_WINDOW_MS`` are merged into one micro-batch, so the
+models see large batches while each web worker stays small.
+
+Start it with ``python -m utils.model_server``; ``gunicorn.conf.py`` does
+this automatically when ``MODEL_SERVER_SOCKET`` is set. Workers reach it
+through ``ModelClient``, which ``utils.model_registry.get_inference()``
+returns in that case.
+
+The server serves no HTTP, so it flushes its metrics (model load and warm-up
+times, encoder totals) to ``METRICS_DIR`` on a timer, and the workers'
+``/metrics`` reports them alongside their own.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from config import Config
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _authkey():
+    if not Config.MODEL_SERVER_AUTHKEY:
+        raise ValueError("MODEL_SERVER_AUTHKEY must be set; gunicorn generates one for the server it starts")
+    return Config.MODEL_SERVER_AUTHKEY.encode()
+
+class _Request:
+    __slots__ = ("texts", "done", "result", "error")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Merges concurrent requests for one operation into shared batches"""
+
+    def __init__(self, name, fn, window_ms=None, max_batch=None):
+        self.name = name
+        self.fn = fn
+        self.window = (Config.MODEL_SERVER_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch = max_batch or Config.MODEL_SERVER_MAX_BATCH
+        self.queue = queue.Queue()
+        self.stats = {"requests": 0, "batches": 0, "texts": 0}
+        threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True).start()
+
+    def submit(self, texts):
+        request = _Request(texts)
+        self.queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.window
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                results = self.fn(texts) if texts else []
+                offset = 0
+                for request in batch:
+                    request.result = results[offset:offset + len(request.texts)]
+                    offset += len(request.texts)
+            except Exception as e:
+                logger.error(f"Model server {self.name} batch failed: {e}")
+                for request in batch:
+                    request.error = e
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["texts"] += len(texts)
+            for request in batch:
+                request.done.set()
+
+
+class ModelServer:
+    """Owns the models and answers requests from worker connections"""
+
+    def __init__(self, address=None, inference=None):
+        from utils.model_registry import LocalInference, get_registry
+        from utils.startup import warm_up
+
+        self.address = address or Config.MODEL_SERVER_SOCKET
+        self.inference = inference or LocalInference(get_registry())
+        # Warm before listening, so workers connecting early wait on the socket instead
+        warm_up(self.inference)
+        self.batchers = {
+            "encode": MicroBatcher("encode", self.inference.encode),
+            "encode_documents": MicroBatcher("encode_documents", self.inference.encode_documents),
+            "extract_skills": MicroBatcher("extract_skills", self.inference.extract_skills),
+        }
+
+    def stats(self):
+        stats = self.inference.stats()
+        stats["model_server"] = {name: dict(b.stats) for name, b in self.batchers.items()}
+        return stats
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if op in self.batchers:
+                        result = self.batchers[op].submit(payload)
+                    elif op == "stats":
+                        result = self.stats()
+                    elif op == "ping":
+                        result = "pong"
+                    else:
+                        raise ValueError(f"Unknown model server operation '{op}'")
+                    conn.send(("ok", result))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        listener = Listener(self.address, family="AF_UNIX", authkey=_authkey())
+        os.chmod(self.address, 0o600)
+        logger.info(f"Model server listening on {self.address}")
+        metrics.flush()
+        metrics.start_flushing()
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f"Rejected model server connection: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+
+class ModelClient:
+    """Worker-side proxy with the same interface as ``LocalInference``"""
+
+    def __init__(self, address, connect_timeout=None):
+        self.address = address
+        self.connect_timeout = Config.MODEL_SERVER_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # Connections must not be shared with a forked child
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                conn = Client(self.address, family="AF_UNIX", authkey=_authkey())
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                # The server may still be loading its models
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _call(self, op, payload=None):
+        conn = self._conn()
+        try:
+            conn.send((op, payload))
+            status, value = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+        if status != "ok":
+            raise RuntimeError(f"Model server error: {value}")
+        return value
+
+    def load(self):
+        self._call("ping")
+        return self
+
+    def encode(self, texts):
+        return self._call("encode", list(texts))
+
+    def encode_documents(self, texts):
+        return self._call("encode_documents", list(texts))
+
+    def extract_skills(self, texts):
+        return self._call("extract_skills", list(texts))
+
+    def stats(self):
+        return self._call("stats")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=Config.LOG_LEVEL,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    ModelServer().serve_forever()
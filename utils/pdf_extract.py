@@ -0,0 +1,187 @@
+"""
+Streaming PDF text extraction.
+
+Pages are parsed lazily and extraction stops once ``PDF_MAX_PAGES`` pages or
+``PDF_MAX_CHARS`` characters have been read, so a resume padded with a long
+portfolio costs no more than its first pages. Large documents can have their
+page ranges parsed in parallel on a process pool; anything shorter is parsed
+once, in-process, by the reader that counted its pages. Sources are read in place:
+in-memory bytes through a zero-copy ``BytesIO`` view and files through
+``mmap``. Results are returned as ``PdfExtraction`` objects carrying page and
+byte counts and the error, if any, instead of printing it. A page that fails
+to parse is skipped and reported in ``error`` while the text of the other
+pages is kept; ``ok`` is false only when no text could be extracted.
+"""
+
+import logging
+import math
+import mmap
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+import PyPDF2
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def pool_size():
+    """Parsing processes for this process: its share of the host's ``EXTRACT_WORKERS``"""
+    return Config.EXTRACT_WORKERS // max(1, Config.SERVER_WORKERS)
+
+
+class PdfExtraction:
+    """Text and bookkeeping from extracting one PDF"""
+
+    __slots__ = ("text", "pages", "pages_total", "bytes", "truncated", "error")
+
+    def __init__(self, text="", pages=0, pages_total=0, size=0, truncated=False, error=None):
+        self.text = text
+        self.pages = pages
+        self.pages_total = pages_total
+        self.bytes = size
+        self.truncated = truncated
+        self.error = error
+
+    @property
+    def ok(self):
+        """Usable: nothing failed, or some pages failed but others gave text"""
+        return self.error is None or bool(self.text)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# Open a PDF source without copying it; returns (stream, size, closer)
+def _open(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # BytesIO shares the initial buffer until written to
+        return BytesIO(source), len(source), None
+    if isinstance(source, (str, os.PathLike)):
+        f = open(source, "rb")
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return f, 0, f.close
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        def close():
+            mapped.close()
+            f.close()
+        return mapped, size, close
+    # Any seekable file object
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+    return source, size, None
+
+
+# Yield the text of each page lazily; with an ``errors`` list a failing page yields "" and is recorded there
+def iter_pdf_pages(reader, start=0, stop=None, errors=None):
+    stop = len(reader.pages) if stop is None else stop
+    for index in range(start, stop):
+        try:
+            yield reader.pages[index].extract_text() or ""
+        except Exception as e:
+            if errors is None:
+                raise
+            errors.append(f"page {index + 1}: {type(e).__name__}: {e}")
+            yield ""
+
+
+# Join page texts the way /rank always has, stopping at the character budget
+def _collect(page_texts, max_chars):
+    parts, chars, pages, truncated = [], 0, 0, False
+    for content in page_texts:
+        pages += 1
+        if content:
+            parts.append(content + " ")
+            chars += len(content) + 1
+        if max_chars and chars >= max_chars:
+            truncated = True
+            break
+    return "".join(parts), pages, truncated
+
+
+def _extract_range(source, start, stop, max_chars):
+    stream, _, close = _open(source)
+    try:
+        reader = PyPDF2.PdfReader(stream)
+        errors = []
+        return (*_collect(iter_pdf_pages(reader, start, stop, errors), max_chars), errors)
+    finally:
+        if close:
+            close()
+
+
+def extract_pdf(source, max_pages=None, max_chars=None, pool=None):
+    """
+    Extract text from a PDF given as bytes, a path or a file object.
+
+    With a process ``pool``, documents of at least ``PDF_PARALLEL_MIN_PAGES``
+    pages are split into page ranges parsed concurrently; smaller documents
+    are parsed here with the reader that counted their pages, since a single
+    pool task would parse them a second time.
+    """
+    max_pages = Config.PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = Config.PDF_MAX_CHARS if max_chars is None else max_chars
+    result = PdfExtraction()
+    close = None
+    spilled = None
+    errors = []
+    try:
+        stream, result.bytes, close = _open(source)
+        reader = PyPDF2.PdfReader(stream)
+        result.pages_total = len(reader.pages)
+        limit = min(result.pages_total, max_pages) if max_pages else result.pages_total
+
+        if pool is None or limit < max(1, Config.PDF_PARALLEL_MIN_PAGES):
+            result.text, result.pages, result.truncated = _collect(iter_pdf_pages(reader, 0, limit, errors),
+                                                                   max_chars)
+        else:
+            # Pool tasks need a picklable source: a path, or bytes when small; larger
+            # file objects are copied once to a file every task maps
+            if not isinstance(source, (bytes, str, os.PathLike)):
+                stream.seek(0)
+                if result.bytes <= Config.DOWNLOAD_SPOOL_KB * 1024:
+                    source = stream.read()
+                else:
+                    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spilled:
+                        shutil.copyfileobj(stream, spilled)
+                    source = spilled.name
+            step = math.ceil(limit / max(1, pool_size()))
+            futures = [pool.submit(_extract_range, source, start, min(start + step, limit), max_chars)
+                       for start in range(0, limit, step)]
+            texts, chars = [], 0
+            for i, future in enumerate(futures):
+                try:
+                    text, pages, truncated, range_errors = future.result()
+                except Exception as e:
+                    # Keep the other ranges; this one is reported like a failed page
+                    errors.append(f"pages {i * step + 1}-{min((i + 1) * step, limit)}: {type(e).__name__}: {e}")
+                    continue
+                errors.extend(range_errors)
+                texts.append(text)
+                chars += len(text)
+                result.pages += pages
+                if truncated or (max_chars and chars >= max_chars):
+                    # Later ranges are past the budget; drop them
+                    for pending in futures[i + 1:]:
+                        pending.cancel()
+                    result.truncated = i + 1 < len(futures) or truncated
+                    break
+            result.text = "".join(texts)
+
+        result.truncated = result.truncated or limit < result.pages_total
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+    finally:
+        if close:
+            close()
+        if spilled is not None:
+            os.remove(spilled.name)
+    if errors:
+        result.error = "; ".join(errors)
+    return result
@@ -0,0 +1,222 @@
+"""
+The resume ranking pipeline behind /rank.
+
+``rank_job`` runs every stage for one job: loading applicants, validating the
+cached ranking, fetching and extracting new resumes, computing features,
+scoring and writing the ranking back to Firestore. It is shared by the
+synchronous endpoint and the background job queue, and reports its progress
+through an optional callback.
+"""
+
+import logging
+
+from config import Config
+from utils import metrics
+from utils.cache import ranking_cache, job_cache
+from utils.feature_store import get_feature_store
+from utils.fetch import fetch_and_extract
+from utils.ranking import (
+    description_hash,
+    build_job_requirements,
+    score_candidates,
+    new_top_score,
+    rank_candidates
+)
+from utils.resume_utils import build_resume_features
+from utils.vector_index import get_vector_index
+
+logger = logging.getLogger(__name__)
+
+
+class RankingError(Exception):
+    """A ranking request that cannot be completed, with the HTTP status to report"""
+
+    def __init__(self, message, status_code=404):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _no_progress(stage, done=0, total=0):
+    pass
+
+
+def _update_index(job_id, candidates, removed):
+    """Add new resume embeddings to the search index and drop removed applicants"""
+    index = get_vector_index()
+    if index is None:
+        return
+    # Search is a side feature; a failing index must not fail the ranking
+    try:
+        index.delete(removed, job=job_id)
+        added = index.add(
+            ((result.url, result.features["embedding"], result.content_hash,
+              {"url": result.url, "name": r.get("fullName"), "email": r.get("email")})
+             for r, result in candidates),
+            job=job_id,
+        )
+        if added:
+            logger.info(f"Vector index: {added} embeddings added, {len(removed)} removed")
+    except Exception as e:
+        logger.warning(f"Vector index update failed for job {job_id}: {e}")
+
+
+def rank_job(store, inference, job_id, job_description, progress=None):
+    """
+    Rank every applicant of ``job_id`` and return the ranked candidate list.
+
+    ``store`` is the ``RankingStore`` holding applicants and rankings.
+
+    ``progress(stage, done, total)`` is called as the pipeline advances.
+    Raises ``RankingError`` when there is nothing to rank.
+    """
+    progress = progress or _no_progress
+
+    progress("loading")
+    digest = description_hash(job_description)
+
+    # Hot jobs are answered from the worker's cache without touching Firestore
+    results = ranking_cache()
+    hit = results.get(job_id)
+    if hit and hit["description_hash"] == digest:
+        logger.info("Using cached rankings from the in-process cache")
+        metrics.inc("rank_results_total", source="memory")
+        return hit["ranked_resumes"]
+
+    # With maintained applicant versions, one parent document read validates the cache
+    with metrics.timer("rank_stage_seconds", stage="version_check"):
+        parent = store.ranking_meta(job_id) if Config.APPLICANT_VERSIONING else None
+    if parent and parent.get("job", {}).get("description_hash") == digest and not parent.get("pending") \
+            and (parent.get("fingerprint") or {}).get("version") == parent.get("applicant_version", 0):
+        cached_data = store.load_ranking(job_id, parent)
+        if cached_data:
+            logger.info("Using cached rankings - applicant version unchanged")
+            metrics.inc("rank_results_total", source="version")
+            results.put(job_id, {"description_hash": digest, "ranked_resumes": cached_data["ranked_resumes"]})
+            return cached_data["ranked_resumes"]
+
+    # Fetch resumes and any cached ranking from Firestore
+    with metrics.timer("rank_stage_seconds", stage="load"):
+        resumes, fingerprint, cached_data = store.load(job_id)
+    # Prefer the version read before the applicants, so a concurrent bump is never recorded as seen
+    fingerprint["version"] = (parent if parent is not None else cached_data or {}).get("applicant_version", 0)
+
+    if not resumes:
+        logger.warning(f"No resumes found for job ID: {job_id}")
+        raise RankingError("No resumes found for this job")
+
+    entries = []
+    for r in resumes:
+        if not r.get("resumeURL"):
+            logger.warning(f"Skipping resume without URL for {r.get('fullName') or r.get('email')}")
+            continue
+        entries.append(r)
+    current_urls = {r["resumeURL"] for r in entries}
+
+    # Reuse the stored job requirements and raw scores if the description is unchanged
+    job = None
+    kept, kept_scores, removed = [], [], []
+    top_score = None
+    if cached_data and cached_data.get("job", {}).get("description_hash") == digest \
+            and len(cached_data.get("raw_scores", [])) == len(cached_data.get("ranked_resumes", [])):
+        job = cached_data["job"]
+        top_score = cached_data.get("top_score")
+        cached_urls = {c["url"] for c in cached_data["ranked_resumes"]}
+
+        # Resumes that failed last time are not in the ranking; retry them even if nobody changed
+        if cached_data.get("fingerprint") == fingerprint and not cached_data.get("pending"):
+            logger.info("Using cached rankings - applicant fingerprint unchanged")
+            metrics.inc("rank_results_total", source="fingerprint")
+            results.put(job_id, {"description_hash": digest, "ranked_resumes": cached_data["ranked_resumes"]})
+            return cached_data["ranked_resumes"]
+
+        for candidate, raw in zip(cached_data["ranked_resumes"], cached_data["raw_scores"]):
+            if candidate["url"] in current_urls:
+                kept.append(candidate)
+                kept_scores.append(raw)
+            else:
+                removed.append(candidate["url"])
+        entries = [r for r in entries if r["resumeURL"] not in cached_urls]
+        logger.info(f"Incremental re-rank: {len(entries)} new, "
+                    f"{len(cached_urls) - len(kept)} removed, {len(kept)} kept")
+    elif cached_data:
+        logger.info("Cache invalidated - job description changed, recomputing rankings")
+
+    # Fetch new resumes, reusing stored features for unchanged PDFs
+    feature_store = get_feature_store()
+    progress("fetching", 0, len(entries))
+    with metrics.timer("rank_stage_seconds", stage="fetch"):
+        fetched = fetch_and_extract(
+            [r["resumeURL"] for r in entries],
+            lookup=feature_store.get,
+            on_progress=lambda done, total: progress("fetching", done, total),
+        )
+
+    candidates, failed = [], []
+    for r, result in zip(entries, fetched):
+        url = result.url
+        if not result.ok:
+            logger.error(f"Error processing resume from {url}: {result.error}")
+            metrics.inc("resumes_total", outcome="failed")
+            failed.append(url)
+            continue
+
+        if result.features is None and not result.text.strip():
+            logger.warning(f"Empty text extracted from resume: {url}")
+            metrics.inc("resumes_total", outcome="empty")
+            continue
+
+        candidates.append((r, result))
+
+    if not candidates and not kept:
+        logger.warning("No valid resumes could be processed")
+        raise RankingError("No valid resumes could be processed")
+
+    # Compute features only for resumes not already in the store
+    missing = [result for _, result in candidates if result.features is None]
+    progress("features", 0, len(missing))
+    if missing:
+        with metrics.timer("rank_stage_seconds", stage="features"):
+            new_features = build_resume_features([result.text for result in missing], inference)
+            for result, features in zip(missing, new_features):
+                result.features = features
+                feature_store.put(result.url, result.content_hash, features)
+    progress("features", len(missing), len(missing))
+    metrics.inc("resumes_total", len(candidates) - len(missing), outcome="feature_hit")
+    metrics.inc("resumes_total", len(missing), outcome="feature_miss")
+    metrics.inc("resumes_total", len(kept), outcome="kept")
+    logger.info(f"Feature store: {len(candidates) - len(missing)} hits, {len(missing)} misses")
+    _update_index(job_id, candidates, removed)
+
+    # Extract job requirements
+    if job is None:
+        job = job_cache().get(digest)
+    if job is None:
+        with metrics.timer("rank_stage_seconds", stage="job_requirements"):
+            job = build_job_requirements(job_description, inference)
+        job_cache().put(digest, job)
+
+    # Score only the new resumes
+    progress("scoring", 0, len(candidates))
+    with metrics.timer("rank_stage_seconds", stage="scoring"):
+        new_scores, new_candidates = score_candidates(
+            [r for r, _ in candidates], [result.features for _, result in candidates], job)
+        raw_scores = list(kept_scores) + new_scores
+        candidate_data = list(kept) + new_candidates
+
+        # Normalize scores and rank over stored and new raw scores
+        if top_score is None:
+            top_score = new_top_score()
+        sorted_results, sorted_raw_scores = rank_candidates(candidate_data, raw_scores, top_score)
+
+    # Cache results and job data in Firestore
+    progress("saving", len(sorted_results), len(sorted_results))
+    with metrics.timer("rank_stage_seconds", stage="save"):
+        store.save_ranking(job_id, sorted_results, sorted_raw_scores, top_score, job,
+                           fingerprint=fingerprint, pending=failed, previous=cached_data)
+    metrics.inc("rank_results_total", source="computed")
+    if not failed:
+        results.put(job_id, {"description_hash": digest, "ranked_resumes": sorted_results})
+
+    logger.info(f"Successfully ranked {len(sorted_results)} resumes for job {job_id}")
+    return sorted_results
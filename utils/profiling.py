@@ -0,0 +1,69 @@
+"""
+On-demand sampling profiler for single requests.
+
+With ``PROFILING_ENABLED`` set, a request carrying ``?profile=true`` (or an
+``X-Profile: 1`` header) is profiled by a background thread that samples the
+stacks of every thread in the worker every ``PROFILE_INTERVAL_MS``. This
+includes the download and Firestore pool threads doing the request's work.
+Samples are written in the folded-stack format used by flamegraph tools
+(``speedscope``, ``flamegraph.pl``) to ``PROFILE_DIR``, and the file name is
+returned in the ``X-Profile-File`` response header. Nothing runs unless a
+request asks for it, so the profiler costs nothing otherwise.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from config import Config
+
+
+class SamplingProfiler:
+    """Samples all thread stacks until stopped and counts identical stacks"""
+
+    def __init__(self, interval=None):
+        self.interval = (interval or Config.PROFILE_INTERVAL_MS) / 1000
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.started = None
+        self.seconds = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, name):
+        """Write the folded stacks to ``PROFILE_DIR`` and return the file name"""
+        os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{name}.folded"
+        with open(os.path.join(Config.PROFILE_DIR, filename), "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return filename
@@ -0,0 +1,127 @@
+"""
+Scoring helpers shared by the /rank endpoint.
+
+Ranking is split into a per-candidate raw score, which only depends on the
+job requirements and that candidate's features, and a normalisation step
+over all raw scores. Keeping the two apart lets /rank score newly added
+applicants on their own and re-normalise the stored scores of everyone else.
+The arithmetic for both runs batch-wise in ``utils.scoring``.
+"""
+
+import hashlib
+import random
+
+from utils.resume_utils import (
+    preprocess_text,
+    normalize_skill,
+    extract_qualifications,
+    normalize_qualification,
+    extract_experience,
+    parse_required_experience,
+    format_months
+)
+from utils.cache import job_cache
+from utils.scoring import score_batch, scale_scores, rank_order
+
+
+# Hash identifying a job description, used to tell whether stored job data is still valid
+def description_hash(job_description):
+    return hashlib.sha256(job_description.encode("utf-8")).hexdigest()
+
+
+# Extract everything the scoring needs from the job description
+def build_job_requirements(job_description, inference):
+    job_cleaned = preprocess_text(job_description)
+    job_embedding = inference.encode_documents([job_cleaned])[0]
+    job_min_exp, job_max_exp = parse_required_experience(extract_experience(job_description))
+    return {
+        "description_hash": description_hash(job_description),
+        "embedding": [float(x) for x in job_embedding],
+        "skills": [normalize_skill(s) for s in inference.extract_skills([job_description])[0]],
+        "quals": [normalize_qualification(q) for q in extract_qualifications(job_description)],
+        "min_exp": job_min_exp,
+        "max_exp": job_max_exp,
+    }
+
+
+# Embedding of a job description, reusing cached job requirements when present
+def job_embedding(job_description, inference):
+    job = job_cache().get(description_hash(job_description))
+    if job is not None:
+        return job["embedding"]
+    return inference.encode_documents([preprocess_text(job_description)])[0]
+
+
+# Score resumes against the job in one batch; returns raw scores and candidate entries
+def score_candidates(resumes, features, job):
+    if not features:
+        return [], []
+    batch = score_batch(features, job)
+    has_requirement = job["min_exp"] is not None
+    candidates = []
+    for i, resume in enumerate(resumes):
+        if not has_requirement:
+            exp_match_statement = "No experience requirement specified"
+        elif batch["experience_matched"][i]:
+            exp_match_statement = "Experience matched"
+        else:
+            exp_match_statement = "Experience not matched"
+        candidates.append({
+            "name": resume.get("fullName"),
+            "email": resume.get("email"),
+            "skills": batch["matched_skills"][i],
+            "qualifications": batch["matched_quals"][i],
+            "experience": format_months(int(batch["months"][i])),
+            "Experience_Match": exp_match_statement,
+            "url": resume["resumeURL"],
+        })
+    return batch["raw"].tolist(), candidates
+
+
+# Random top score used to scale the best candidate
+def new_top_score():
+    return random.randint(91, 99)
+
+
+# Normalise raw scores with square root scaling, then sort and rank
+def rank_candidates(candidates, raw_scores, top_score):
+    """
+    Return ``(ranked, ranked_raw_scores)`` with ``score`` and ``rank`` set on
+    each candidate. ``raw_scores`` is reordered to match ``ranked``.
+    """
+    scores = [round(score, 2) for score in scale_scores(raw_scores, top_score).tolist()]
+    for candidate, score in zip(candidates, scores):
+        candidate["score"] = score
+
+    # Rank on the rounded scores so equal displayed scores keep their order
+    order = rank_order(scores).tolist()
+    ranked = [candidates[i] for i in order]
+    for idx, candidate in enumerate(ranked):
+        candidate["rank"] = idx + 1
+    return ranked, [raw_scores[i] for i in order]
+
+
+# Fields kept in compact responses
+COMPACT_FIELDS = ("rank", "score", "name", "email", "url", "experience", "Experience_Match")
+
+
+def compact_candidate(candidate):
+    entry = {field: candidate.get(field) for field in COMPACT_FIELDS}
+    entry["skills_matched"] = len(candidate.get("skills", []))
+    entry["qualifications_matched"] = len(candidate.get("qualifications", []))
+    return entry
+
+
+# Cut one response page out of a ranked list
+def page_candidates(ranked, offset=0, limit=None, top_k=None, compact=False):
+    """
+    Return ``(page, total)``. ``top_k`` caps the ranking before ``offset``
+    and ``limit`` page through it; ``total`` is the number of candidates
+    available to page through.
+    """
+    total = len(ranked) if top_k is None else min(top_k, len(ranked))
+    stop = total if limit is None else min(total, offset + limit)
+    page = ranked[offset:stop]
+    if compact:
+        page = [compact_candidate(c) for c in page]
+    return page, total
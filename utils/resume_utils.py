@@ -1,51 +1,79 @@
-import PyPDF2
+import hashlib
+import logging
 import re
-import spacy
-import subprocess
-from sentence_transformers import SentenceTransformer
-from dateutil import parser as date_parser
-from dateutil.relativedelta import relativedelta
+import threading
+from collections import OrderedDict
 from datetime import datetime
+import numpy as np
+from config import Config
+from utils import metrics
+from utils.model_registry import get_registry
+from utils.pdf_extract import extract_pdf
 
-# Load models (run only once)
+logger = logging.getLogger(__name__)
+
+# Patterns are compiled once at import; scan_resume runs the per-resume ones
+_NON_WORD_RE = re.compile(r'[^a-zA-Z0-9_\s]+')
+_SKILL_SEPARATORS_RE = re.compile(r'[\s\.\-]+')
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+# Spelled out before punctuation is dropped, so c++, c# and c stay three skills
+_SKILL_SYMBOLS = (('+', 'plus'), ('#', 'sharp'))
+_QUALIFICATION_RE = re.compile(
+    r"\b(bachelor|bachelors|bachelor's|bs|b\.tech|bsc|master|masters|master's|ms|m\.tech|msc|phd|ph\.d|m\.phil|mba|bba|computer science|engineering|it|software|cs)\b"
+)
+# One pass for "fresh to 6 months", "1-2 years" and "2 years"; a range also yields its tail
+_EXPERIENCE_RE = re.compile(r'(?=[f\d])(?:(fresh|\d+)\s*(?:to|-|–)\s*)?(\d+\s*(?:years?|months?))')
+_REQ_FRESH_RE = re.compile(r'fresh\s*(?:to|-|–)\s*(\d+)\s*months?')
+_REQ_MONTH_RANGE_RE = re.compile(r'(\d+)\s*(?:-|to|–)\s*(\d+)\s*months?')
+_REQ_YEAR_RANGE_RE = re.compile(r'(\d+)\s*(?:-|to|–)\s*(\d+)\s*years?')
+_REQ_YEARS_RE = re.compile(r'(\d+)\s*years?')
+_REQ_MONTHS_RE = re.compile(r'(\d+)\s*months?')
+# The section always runs to the next "HEADING:" line or the end of the text
+_SECTION_RE = re.compile(r'(WORK EXPERIENCE|EXPERIENCE|EMPLOYMENT HISTORY)[:\s\n]*(.*?)(?:\n[A-Z][A-Z\s]+:|\Z)', re.DOTALL | re.IGNORECASE)
+_PERIOD_RE = re.compile(
+    r'([A-Za-z]{3,9} \d{4})\s*(?:–|-|to)\s*([A-Za-z]{3,9} \d{4}|current|present)'
+    r'|(\d{2}[/\-]\d{4})\s*(?:–|-|to)\s*(\d{2}[/\-]\d{4}|current|present)',
+    re.IGNORECASE
+)
+
+_MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'),
+        ('may',), ('jun', 'june'), ('jul', 'july'), ('aug', 'august'),
+        ('sep', 'sept', 'september'), ('oct', 'october'), ('nov', 'november'), ('dec', 'december'),
+    ], start=1)
+    for name in names
+}
+
+_scan_cache = OrderedDict()
+_scan_cache_lock = threading.Lock()
+
+# Load models (once per process, shared through the model registry)
 def load_models():
-    spacy_model = "en_core_web_lg"
-    try:
-        nlp = spacy.load(spacy_model)
-    except OSError:
-        subprocess.run(["python", "-m", "spacy", "download", spacy_model], check=True)
-        nlp = spacy.load(spacy_model)
-    model = SentenceTransformer("all-mpnet-base-v2")
-    return nlp, model
+    registry = get_registry().load()
+    return registry.nlp, registry.engine
 
 # Extract text from PDF
 def extract_text_from_pdf(uploaded_file):
-    text = ""
-    try:
-        reader = PyPDF2.PdfReader(uploaded_file)
-        for page in reader.pages:
-            content = page.extract_text()
-            if content:
-                text += content + " "
-    except Exception as e:
-        print(f"Error reading PDF: {e}")
-    return text
+    result = extract_pdf(uploaded_file)
+    if result.error:
+        logger.warning(f"Error reading PDF: {result.error}")
+    return result.text
 
 # Clean text
 def preprocess_text(text):
-    text = re.sub(r'([a-zA-Z])\.([a-zA-Z])', r'\1.\2', text)
-    text = text.lower()
-    text = re.sub(r'[^a-zA-Z0-9_\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    text = _NON_WORD_RE.sub('', text.lower())
+    return ' '.join(text.split())
 
 # Normalize skills
 def normalize_skill(skill):
-    skill = skill.lower()
-    skill = re.sub(r'[\s\.\-]', '', skill)
+    skill = _SKILL_SEPARATORS_RE.sub('', skill.lower())
     if skill.endswith('js'):
         skill = skill[:-2]
-    skill = re.sub(r'[^a-z0-9]', '', skill)
+    for symbol, name in _SKILL_SYMBOLS:
+        skill = skill.replace(symbol, name)
+    skill = _NON_ALNUM_RE.sub('', skill)
     return skill
 
 # Normalize qualifications
@@ -69,36 +97,51 @@ def normalize_qualification(q):
     return q
 
 # Extract skills using NLP
-def extract_skills_dynamic(text):
-    nlp = spacy.load("en_core_web_lg")
-    doc = nlp(text)
-    skills = set()
-    for chunk in doc.noun_chunks:
-        if 1 < len(chunk.text) < 40:
-            skills.add(chunk.text.strip().lower())
-    for ent in doc.ents:
-        if ent.label_ in ["SKILL", "LANGUAGE"]:
-            skills.add(ent.text.strip().lower())
-    skills = {s for s in skills if not nlp.vocab[s].is_stop and len(s) > 2}
-    qualifications = set(extract_qualifications(text))
-    return list(skills - qualifications)
+def extract_skills_dynamic(text, nlp=None):
+    return extract_skills_batch([text], nlp)[0]
+
+# Extract skills for many texts at once with nlp.pipe
+def extract_skills_batch(texts, nlp=None, batch_size=None, n_process=None):
+    if nlp is None:
+        nlp = get_registry().nlp
+    batch_size = batch_size or Config.SPACY_BATCH_SIZE
+    n_process = n_process or Config.SPACY_N_PROCESS
+    # Pipelines loaded outside the registry may still carry the unused components
+    disable = [name for name in Config.SPACY_EXCLUDE if name in nlp.pipe_names]
+    docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable)
+    results = []
+    for text, doc in zip(texts, docs):
+        skills = set()
+        for chunk in doc.noun_chunks:
+            if 1 < len(chunk.text) < 40:
+                skills.add(chunk.text.strip().lower())
+        # en_core_web_* tags programming languages as LANGUAGE; empty if "ner" is in SPACY_EXCLUDE
+        for ent in doc.ents:
+            if ent.label_ in ["SKILL", "LANGUAGE"]:
+                skills.add(ent.text.strip().lower())
+        skills = {s for s in skills if not nlp.vocab[s].is_stop and len(s) > 2}
+        # Memoized, so this does not rescan texts whose fields were already extracted
+        qualifications = set(scan_resume(text)["quals"])
+        results.append(list(skills - qualifications))
+    return results
+
+# Extract skills for many texts by looking them up in the skill taxonomy
+def extract_skills_taxonomy(texts, matcher=None, batch_size=None):
+    if matcher is None:
+        matcher = get_registry().skill_matcher
+    results = []
+    for text, skills in zip(texts, matcher.extract(texts, batch_size)):
+        qualifications = set(scan_resume(text)["quals"])
+        results.append(list(skills - qualifications))
+    return results
 
 # Extract qualifications
 def extract_qualifications(text):
-    pattern = r"\b(bachelor|bachelors|bachelor's|bs|b\.tech|bsc|master|masters|master's|ms|m\.tech|msc|phd|ph\.d|m\.phil|mba|bba|computer science|engineering|it|software|cs)\b"
-    return list(set(re.findall(pattern, text.lower())))
+    return list(scan_resume(text)["quals"])
 
 # Extract experience patterns
 def extract_experience(text):
-    patterns = [
-        r'(fresh\s*(?:to|-|–)\s*\d+\s*(?:years?|months?))',    # e.g. Fresh to 6 months
-        r'(\d+\s*(?:to|-|–)\s*\d+\s*(?:years?|months?))',      # e.g. 1-2 years, 6 months - 1 year, 1 to 2 years
-        r'(\d+\s*(?:years?|months?))',                         # e.g. 2 years, 6 months
-    ] 
-    matches = []
-    for pattern in patterns:
-        matches += re.findall(pattern, text.lower())
-    return list(set(matches))
+    return list(scan_resume(text)["experience"])
 
 # Parse required experience
 def parse_required_experience(job_exps):
@@ -108,27 +151,27 @@ def parse_required_experience(job_exps):
         exp = exp.lower()
         if 'fresh' in exp:
             all_mins.append(0)
-            match = re.search(r'fresh\s*(?:to|-|–)\s*(\d+)\s*months?', exp)
+            match = _REQ_FRESH_RE.search(exp)
             if match:
                 all_maxs.append(int(match.group(1)))
             continue
-        match = re.search(r'(\d+)\s*(?:-|to|–)\s*(\d+)\s*months?', exp)
+        match = _REQ_MONTH_RANGE_RE.search(exp)
         if match:
             all_mins.append(int(match.group(1)))
             all_maxs.append(int(match.group(2)))
             continue
-        match = re.search(r'(\d+)\s*(?:-|to|–)\s*(\d+)\s*years?', exp)
+        match = _REQ_YEAR_RANGE_RE.search(exp)
         if match:
             all_mins.append(int(match.group(1)) * 12)
             all_maxs.append(int(match.group(2)) * 12)
             continue
-        match = re.search(r'(\d+)\s*years?', exp)
+        match = _REQ_YEARS_RE.search(exp)
         if match:
             months = int(match.group(1)) * 12
             all_mins.append(months)
             all_maxs.append(months)
             continue
-        match = re.search(r'(\d+)\s*months?', exp)
+        match = _REQ_MONTHS_RE.search(exp)
         if match:
             months = int(match.group(1))
             all_mins.append(months)
@@ -142,37 +185,97 @@ def parse_required_experience(job_exps):
 
 # Extract WORK EXPERIENCE section
 def extract_work_experience_section(text):
-    match = re.search(r'(WORK EXPERIENCE|EXPERIENCE|EMPLOYMENT HISTORY)[:\s\n]*(.*?)(?:\n[A-Z][A-Z\s]+:|\Z)', text, re.DOTALL | re.IGNORECASE)
-    if match:
-        return match.group(2)
-    match = re.search(r'(WORK EXPERIENCE|EXPERIENCE|EMPLOYMENT HISTORY)[:\s\n]*(.*)', text, re.DOTALL | re.IGNORECASE)
-    if match:
-        return match.group(2)
-    return ""
-
-# Extract date periods from experience section
-def extract_work_periods(text):
-    pattern1 = r'([A-Za-z]{3,9} \d{4})\s*(?:–|-|to)\s*([A-Za-z]{3,9} \d{4}|current|present)'
-    pattern2 = r'(\d{2}[/\-]\d{4})\s*(?:–|-|to)\s*(\d{2}[/\-]\d{4}|current|present)'
-    matches = re.findall(pattern1, text, re.IGNORECASE) + re.findall(pattern2, text, re.IGNORECASE)
+    match = _SECTION_RE.search(text)
+    return match.group(2) if match else ""
+
+# Month index (year * 12 + month - 1) of a "Mon YYYY" or "MM/YYYY" token, or None
+def parse_month(token):
+    year = int(token[-4:])
+    month = token[:-5]
+    month = int(month) if month.isdigit() else _MONTHS.get(month.lower())
+    if not month or month > 12 or year == 0:
+        return None
+    return year * 12 + month - 1
+
+# Extract date periods from experience section as (start, end) month indices
+def extract_work_periods(text, today=None):
+    today = today or datetime.today()
+    current = today.year * 12 + today.month - 1
     periods = []
-    for start, end in matches:
-        try:
-            start_date = date_parser.parse(start)
-            end_date = datetime.today() if end.lower() in ['current', 'present'] else date_parser.parse(end)
-            if end_date < start_date:
-                continue
-            delta = relativedelta(end_date, start_date)
-            total_months = delta.years * 12 + delta.months
-            if 0 <= total_months <= 600:
-                periods.append(total_months)
-        except Exception:
+    for match in _PERIOD_RE.finditer(text):
+        start, end = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+        start_month = parse_month(start)
+        end_month = current if end.lower() in ('current', 'present') else parse_month(end)
+        if start_month is None or end_month is None:
             continue
+        if 0 <= end_month - start_month <= 600:
+            periods.append((start_month, end_month))
     return periods
 
-# Calculate total months of experience
+# Scan a resume once for qualifications, experience phrases, work section and periods
+def scan_resume(text):
+    """
+    Extract the regex fields of a resume once, memoized by text hash.
+
+    Returns a dict with ``quals`` and ``experience`` (distinct raw matches),
+    ``work_section`` and ``periods``. Treat the result as read-only; it is
+    shared between callers.
+    """
+    key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    with _scan_cache_lock:
+        cached = _scan_cache.get(key)
+        if cached is not None:
+            _scan_cache.move_to_end(key)
+            return cached
+
+    lowered = text.lower()
+    experience = set()
+    for match in _EXPERIENCE_RE.finditer(lowered):
+        experience.add(match.group(2))
+        if match.group(1):
+            experience.add(match.group(0))
+    work_section = extract_work_experience_section(text)
+    fields = {
+        "quals": tuple(set(_QUALIFICATION_RE.findall(lowered))),
+        "experience": tuple(experience),
+        "work_section": work_section,
+        "periods": tuple(extract_work_periods(work_section)),
+    }
+
+    with _scan_cache_lock:
+        _scan_cache[key] = fields
+        if len(_scan_cache) > Config.SCAN_CACHE_SIZE:
+            _scan_cache.popitem(last=False)
+    return fields
+
+# Calculate total months of experience, counting overlapping jobs once
 def total_experience_in_months(periods):
-    return sum(periods)
+    total, covered = 0, None
+    for start, end in sorted(periods):
+        if covered is not None and start < covered:
+            start = covered
+        if end > start:
+            total += end - start
+        covered = end if covered is None else max(covered, end)
+    return total
+
+# Total experience for many resumes at once; one entry per period list
+def total_experience_batch(period_lists):
+    counts = np.fromiter((len(p) for p in period_lists), dtype=np.int64, count=len(period_lists))
+    if not counts.sum():
+        return np.zeros(len(period_lists), dtype=np.int64)
+    bounds = np.array([pair for p in period_lists for pair in p], dtype=np.int64)
+    groups = np.repeat(np.arange(len(period_lists)), counts)
+    order = np.lexsort((bounds[:, 0], groups))
+    groups = groups[order]
+    # Offsetting each resume past the previous one's months lets a single running max serve all of them
+    offset = groups * (int(bounds.max()) + 1)
+    starts = bounds[order, 0] + offset
+    ends = bounds[order, 1] + offset
+    covered = np.maximum.accumulate(ends)
+    previous = np.concatenate(([-1], covered[:-1]))
+    months = np.clip(ends - np.maximum(starts, previous), 0, None)
+    return np.bincount(groups, weights=months, minlength=len(period_lists)).astype(np.int64)
 
 # Format months into human-readable format
 def format_months(months):
@@ -182,3 +285,25 @@ def format_months(months):
         return f"{years} year{'s' if years > 1 else ''} {rem_months} month{'s' if rem_months != 1 else ''}".strip()
     else:
         return f"{rem_months} month{'s' if rem_months != 1 else ''}"
+
+# Compute the per-resume features used for ranking (one embedding batch for all texts)
+def build_resume_features(texts, inference):
+    with metrics.timer("resume_stage_seconds", stage="preprocess"):
+        cleaned = [preprocess_text(t) for t in texts]
+    with metrics.timer("resume_stage_seconds", stage="embed"):
+        embeddings = inference.encode_documents(cleaned)
+    with metrics.timer("resume_stage_seconds", stage="skills"):
+        skill_lists = inference.extract_skills(texts)
+    with metrics.timer("resume_stage_seconds", stage="fields"):
+        scans = [scan_resume(text) for text in texts]
+    features = []
+    for text, clean, embedding, skills, fields in zip(texts, cleaned, embeddings, skill_lists, scans):
+        features.append({
+            "text": text,
+            "cleaned": clean,
+            "embedding": embedding,
+            "skills": [normalize_skill(s) for s in skills],
+            "quals": [normalize_qualification(q) for q in fields["quals"]],
+            "periods": [list(p) for p in fields["periods"]],
+        })
+    return features
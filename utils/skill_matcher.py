@@ -0,0 +1,105 @@
+"""
+Dictionary skill extraction over a curated taxonomy.
+
+With ``SKILL_EXTRACTION_MODE=taxonomy`` skills are found by looking up the
+names and aliases in ``SKILL_TAXONOMY_PATH`` instead of treating every noun
+chunk as a skill. The taxonomy is compiled once per process into a spaCy
+``PhraseMatcher`` on lower-cased tokens, so a text only needs the tokenizer:
+no tagger or parser runs, extraction is linear in the length of the text and
+the skill sets contain only known skills. Matches are reported by canonical
+name, and names that ``normalize_qualification`` maps to a degree are left to
+the qualification extraction. Ranking compares skills after
+``normalize_skill``, so ``check_taxonomy`` refuses a taxonomy in which two
+skills would normalize to the same name, or share a name or alias, since one
+would then get credit for the other.
+
+The taxonomy is a JSON object ``{"skills": {canonical: [alias, ...]}}``.
+"""
+
+import hashlib
+import json
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MODES = ("noun_chunks", "taxonomy")
+
+
+def load_taxonomy(path=None):
+    """Return ``{canonical: [alias, ...]}`` from the taxonomy file"""
+    with open(path or Config.SKILL_TAXONOMY_PATH, encoding="utf-8") as f:
+        return json.load(f)["skills"]
+
+
+def taxonomy_version(path=None):
+    """Short hash of the taxonomy file, so editing it invalidates stored skills"""
+    with open(path or Config.SKILL_TAXONOMY_PATH, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def check_taxonomy(taxonomy):
+    """Raise ``ValueError`` if two skills of ``taxonomy`` could be confused when ranking"""
+    from utils.resume_utils import normalize_skill
+
+    problems, keys, owners = [], {}, {}
+    for canonical, aliases in taxonomy.items():
+        key = normalize_skill(canonical)
+        if key in keys:
+            problems.append(f"'{keys[key]}' and '{canonical}' both normalize to '{key}'")
+        keys.setdefault(key, canonical)
+        for name in {n.lower() for n in [canonical, *aliases]}:
+            if name in owners:
+                problems.append(f"'{name}' names both '{owners[name]}' and '{canonical}'")
+            owners.setdefault(name, canonical)
+    if problems:
+        raise ValueError(f"Ambiguous skill taxonomy: {'; '.join(problems)}")
+
+
+def extraction_version():
+    """The skill extraction part of ``FEATURE_VERSION``"""
+    if Config.SKILL_EXTRACTION_MODE not in MODES:
+        raise ValueError(f"Unknown SKILL_EXTRACTION_MODE '{Config.SKILL_EXTRACTION_MODE}', "
+                         f"expected one of {', '.join(MODES)}")
+    if Config.SKILL_EXTRACTION_MODE == "taxonomy":
+        return f"taxonomy-{taxonomy_version()}"
+    return Config.SKILL_EXTRACTION_MODE
+
+
+class SkillMatcher:
+    """Finds taxonomy skills in texts using only the tokenizer of ``nlp``"""
+
+    def __init__(self, nlp, taxonomy=None):
+        from spacy.matcher import PhraseMatcher
+        from utils.resume_utils import normalize_qualification, normalize_skill
+
+        self.nlp = nlp
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        taxonomy = load_taxonomy() if taxonomy is None else taxonomy
+        check_taxonomy(taxonomy)
+        # match id -> canonical name reported for it
+        self.names = {}
+        for canonical, aliases in taxonomy.items():
+            if not normalize_skill(canonical):
+                logger.warning(f"Skill '{canonical}' normalizes to nothing; skipped")
+                continue
+            names = [n for n in [canonical, *aliases] if normalize_qualification(n.lower()) == n.lower()]
+            if not names:
+                continue
+            label = canonical.lower()
+            match_id = nlp.vocab.strings.add(label)
+            self.names[match_id] = label
+            self.matcher.add(label, list(nlp.tokenizer.pipe(names)))
+        logger.info(f"Compiled {len(self.names)} taxonomy skills")
+
+    def __call__(self, doc):
+        """Canonical names of the skills in a tokenized ``doc``"""
+        return {self.names[match_id] for match_id, _, _ in self.matcher(doc)}
+
+    def extract(self, texts, batch_size=None):
+        batch_size = batch_size or Config.SPACY_BATCH_SIZE
+        # Collapsed whitespace lets phrases wrapped across lines match, and long texts full of line
+        # breaks tokenize many times slower than the same text on one line
+        flat = (" ".join(text.split()) for text in texts)
+        return [self(doc) for doc in self.nlp.tokenizer.pipe(flat, batch_size=batch_size)]
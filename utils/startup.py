@@ -0,0 +1,201 @@
+"""
+Worker startup: model loading, warm-up, readiness and startup timing.
+
+``MODEL_LOAD_MODE`` chooses when a worker's models are loaded:
+
+- ``eager`` (default): while the app is imported. With gunicorn's
+  ``preload_app`` this happens once in the master, and every worker,
+  including those recycled after ``max_requests``, is forked with the models
+  already loaded. Only loading happens there: torch and spaCy inference are not
+  safe to run before a fork, so each worker runs the warm-up itself in
+  ``post_fork``, before it serves anything, and is ready only after that.
+- ``background``: on a thread started in each worker after the fork (or on
+  its first request), so the worker accepts connections immediately and
+  ``/ready`` reports 503 until loading and warm-up have finished.
+
+Behind a model server the models live in that process, which warms up before
+it accepts connections; workers then only check they can reach it, after the
+fork, since the server is started alongside the workers.
+
+Warm-up runs one embedding batch and one spaCy pass over a few resume-like
+texts, so the first real request does not pay one-off initialisation costs.
+Each phase of startup is timed; ``phases()`` returns the timings for
+``/ready`` and ``/health``, and they are exported as metrics.
+
+Models are never downloaded at boot. Bake them into the image (or the
+``MODEL_CACHE_DIR`` volume) with ``python -m utils.startup prefetch`` and set
+``MODELS_OFFLINE=true`` so the Hugging Face libraries never touch the network.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+MODES = ("eager", "background")
+
+# Short texts in the shapes the models see in production; long enough to hit the real kernels
+WARMUP_TEXTS = [
+    "Senior software engineer with 5 years of experience in Python, SQL and machine learning. "
+    "Bachelor of Science in Computer Science. Jan 2019 - present at Example Corp.",
+    "Data analyst skilled in pandas, dashboards and stakeholder reporting, 2-3 years experience.",
+    "Looking for a backend developer familiar with Flask, Docker and cloud deployments.",
+]
+
+_phases = {}
+_ready = threading.Event()
+_failed = None
+_thread = None
+_thread_lock = threading.Lock()
+_inference = None
+_loaded = False
+
+
+@contextmanager
+def phase(name):
+    """Time one startup phase"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        _phases[name] = round(seconds, 3)
+        metrics.set_gauge("startup_phase_seconds", seconds, phase=name)
+        logger.info(f"Startup phase {name} took {seconds:.2f}s")
+
+
+def record_phase(name, seconds):
+    _phases[name] = round(seconds, 3)
+    metrics.set_gauge("startup_phase_seconds", seconds, phase=name)
+
+
+def phases():
+    return dict(_phases)
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def status():
+    """Readiness and startup timings, as reported by ``/ready``"""
+    return {
+        "ready": is_ready(),
+        "mode": Config.MODEL_LOAD_MODE,
+        "error": _failed,
+        "startup_seconds": phases(),
+    }
+
+
+def _load(inference):
+    global _loaded
+    with phase("model_load"):
+        inference.load()
+    _loaded = True
+
+
+def warm_up(inference):
+    """Load the models behind ``inference`` unless already loaded and run them once; marks the process ready"""
+    global _failed
+    try:
+        if not _loaded:
+            _load(inference)
+        with phase("warmup_encoder"):
+            inference.encode_documents(WARMUP_TEXTS)
+        with phase("warmup_spacy"):
+            inference.extract_skills(WARMUP_TEXTS)
+    except Exception as e:
+        _failed = str(e)
+        logger.error(f"Model warm-up failed: {e}")
+        raise
+    _failed = None
+    _ready.set()
+    metrics.set_gauge("ready", 1)
+
+
+def start_background_warmup(inference):
+    """Start warming up on a thread unless already started or done in this process"""
+    global _thread
+    with _thread_lock:
+        if _ready.is_set() or (_thread is not None and _thread.is_alive()):
+            return
+        _thread = threading.Thread(target=_warm_up_quietly, args=(inference,), name="warmup", daemon=True)
+        _thread.start()
+
+
+def _warm_up_quietly(inference):
+    try:
+        warm_up(inference)
+    except Exception:
+        pass  # reported through status(); a later /ready retries
+
+
+def begin(inference):
+    """Called once the app is imported: load now (without running the models) or leave it to the worker"""
+    global _inference
+    from utils.model_registry import LocalInference
+
+    if Config.MODEL_LOAD_MODE not in MODES:
+        raise ValueError(f"Unknown MODEL_LOAD_MODE '{Config.MODEL_LOAD_MODE}', expected one of {', '.join(MODES)}")
+    _inference = inference
+    metrics.set_gauge("ready", 0)
+    if Config.MODEL_LOAD_MODE == "eager" and isinstance(inference, LocalInference):
+        _load(inference)
+
+
+def worker_started():
+    """
+    gunicorn ``post_fork`` hook: warm up the models loaded before the fork
+    before the worker serves, or start loading them in the background
+    """
+    if _inference is None:
+        return
+    if Config.MODEL_LOAD_MODE == "eager" and _loaded:
+        warm_up(_inference)
+    else:
+        start_background_warmup(_inference)
+
+
+def _reset_after_fork():
+    # Threads do not survive a fork; a worker forked mid-warm-up starts its own
+    global _thread, _thread_lock
+    _thread = None
+    _thread_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def prefetch():
+    """Download every configured model into the local caches (run at image build time)"""
+    import subprocess
+    import sys
+
+    try:
+        import spacy
+        spacy.load(Config.SPACY_MODEL, exclude=Config.SPACY_EXCLUDE)
+        logger.info(f"spaCy model {Config.SPACY_MODEL} already installed")
+    except OSError:
+        subprocess.run([sys.executable, "-m", "spacy", "download", Config.SPACY_MODEL], check=True)
+
+    from utils.encoder_backends import load_encoder
+    Config.MODELS_OFFLINE = False
+    load_encoder()
+    logger.info(f"Encoder {Config.SENTENCE_TRANSFORMER_MODEL} ({Config.SENTENCE_TRANSFORMER_BACKEND}) "
+                f"cached in {Config.MODEL_CACHE_DIR}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "prefetch"
+    if command != "prefetch":
+        sys.exit(f"Unknown command '{command}', expected prefetch")
+    prefetch()
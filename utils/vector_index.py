@@ -0,0 +1,401 @@
+"""
+Persistent nearest-neighbour index over resume embeddings.
+
+Every resume embedded by ``/rank`` is added to an on-disk index, so
+``/search`` can find the best existing candidates for a new job description
+across all jobs without re-embedding anything. The index lives in
+``VECTOR_INDEX_DIR``:
+
+- ``vectors.f32`` - a flat float32 matrix of L2-normalised embeddings, one row
+  per entry, read through ``np.memmap``
+- ``index.db`` - SQLite rows mapping each matrix row to its resume URL,
+  content hash, candidate details, tombstone flag and IVF list, plus the jobs
+  each resume is an applicant of
+- ``centroids.npy`` - optional IVF centroids (``build_ivf``)
+
+A resume is stored once however many jobs it was submitted to. Adding it
+for another job only records that job, and adding it with new content
+tombstones the old row and appends a new one. Deleting it for a job forgets
+that job, and the row is tombstoned once no job is left; ``compact`` rewrites
+the matrix without tombstones. Writers from all
+gunicorn workers are serialised with a file lock; readers remap the matrix
+when the index generation changes, which only happens when rows are written or
+tombstoned. Job membership is read for the hits at search time, so recording a
+job for a resume that is already indexed does not invalidate any view.
+
+Search is exact (one matrix-vector product over the live rows) unless IVF
+centroids exist, in which case only the ``VECTOR_INDEX_NPROBE`` nearest lists
+are scanned. Run ``python -m utils.vector_index`` for maintenance
+(``stats``, ``backfill``, ``build-ivf``, ``compact``).
+"""
+
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from config import Config
+from utils.feature_store import FEATURE_VERSION, get_feature_store
+from utils.scoring import rank_order
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the on-disk layout changes, which resets indexes written by older code
+_LAYOUT = "2"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    row INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    content_hash TEXT,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    list INTEGER NOT NULL DEFAULT -1,
+    info TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_key ON entries (key);
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT NOT NULL,
+    job TEXT NOT NULL,
+    PRIMARY KEY (key, job)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _normalise(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class _View:
+    """Read-only snapshot of the index at one generation"""
+
+    def __init__(self, generation, matrix, keys, infos, alive, lists, centroids):
+        self.generation = generation
+        self.matrix = matrix
+        self.keys = keys
+        self.infos = infos
+        self.alive = alive
+        self.lists = lists
+        self.centroids = centroids
+
+
+class VectorIndex:
+    """Memory-mapped flat index with tombstones and an optional IVF layer"""
+
+    def __init__(self, directory=None, version=FEATURE_VERSION):
+        self.directory = directory or Config.VECTOR_INDEX_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.centroids_path = os.path.join(self.directory, "centroids.npy")
+        self.version = version
+        self._local = threading.local()
+        self._view_lock = threading.Lock()
+        self._view = None
+        self._conn().executescript(_SCHEMA)
+        with self._write_lock() as conn:
+            stored = self._meta(conn, "version")
+            if stored != version or self._meta(conn, "layout") != _LAYOUT:
+                if stored is not None:
+                    logger.warning(f"Vector index built for {stored} (layout {self._meta(conn, 'layout')}), "
+                                   f"resetting for {version} (layout {_LAYOUT})")
+                self._reset(conn)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # SQLite connections must not cross gunicorn's fork
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(os.path.join(self.directory, "index.db"), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive across processes; yields a connection inside a transaction"""
+        with open(os.path.join(self.directory, "write.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _meta(conn, name):
+        row = conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_meta(conn, name, value):
+        conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, str(value)))
+
+    @staticmethod
+    def _bump(conn):
+        """Invalidate every reader's view; call whenever entries, vectors or centroids change"""
+        conn.execute(
+            "INSERT INTO meta VALUES ('generation', '1') "
+            "ON CONFLICT(name) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def _reset(self, conn):
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM jobs")
+        conn.execute("DELETE FROM meta WHERE name != 'generation'")
+        self._set_meta(conn, "version", self.version)
+        self._set_meta(conn, "layout", _LAYOUT)
+        self._bump(conn)
+        open(self.vectors_path, "wb").close()
+        if os.path.exists(self.centroids_path):
+            os.remove(self.centroids_path)
+
+    def _dimension(self, conn):
+        value = self._meta(conn, "dimension")
+        return int(value) if value else None
+
+    # Writing
+
+    def add(self, items, job=None):
+        """
+        Add ``(key, vector, content_hash, info)`` items; returns how many rows
+        were written. ``info`` is a JSON-serialisable dict returned by search.
+        ``job`` is recorded for every key, including those already indexed.
+        """
+        items = list(items)
+        if not items:
+            return 0
+        with self._write_lock() as conn:
+            dimension = self._dimension(conn)
+            centroids = np.load(self.centroids_path) if os.path.exists(self.centroids_path) else None
+            (next_row,) = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM entries").fetchone()
+            rows, vectors = [], []
+            for key, vector, digest, info in items:
+                if job is not None:
+                    conn.execute("INSERT OR IGNORE INTO jobs VALUES (?, ?)", (key, job))
+                current = conn.execute(
+                    "SELECT row, content_hash FROM entries WHERE key = ? AND deleted = 0", (key,)
+                ).fetchone()
+                if current is not None and digest is not None and current[1] == digest:
+                    continue
+                vector = _normalise(vector)[0]
+                if dimension is None:
+                    dimension = vector.shape[0]
+                    self._set_meta(conn, "dimension", dimension)
+                if vector.shape[0] != dimension:
+                    raise ValueError(f"Vector of size {vector.shape[0]} added to an index of size {dimension}")
+                if current is not None:
+                    conn.execute("UPDATE entries SET deleted = 1 WHERE row = ?", (current[0],))
+                cell = int(np.argmax(centroids @ vector)) if centroids is not None else -1
+                rows.append((next_row, key, digest, cell, json.dumps(info)))
+                vectors.append(vector)
+                next_row += 1
+            if not rows:
+                return 0
+            # Rows are written at their own offsets, so a failed commit leaves nothing misaligned
+            with open(self.vectors_path, "r+b") as f:
+                f.seek(rows[0][0] * dimension * 4)
+                f.write(np.asarray(vectors, dtype=np.float32).tobytes())
+            conn.executemany("INSERT INTO entries (row, key, content_hash, list, info) VALUES (?, ?, ?, ?, ?)", rows)
+            self._bump(conn)
+        return len(rows)
+
+    def delete(self, keys, job=None):
+        """
+        Forget ``keys`` for ``job`` and tombstone those no job refers to any
+        more; without ``job`` the keys are tombstoned for every job.
+        """
+        keys = list(keys)
+        if not keys:
+            return
+        with self._write_lock() as conn:
+            if job is None:
+                conn.executemany("DELETE FROM jobs WHERE key = ?", [(k,) for k in keys])
+            else:
+                conn.executemany("DELETE FROM jobs WHERE key = ? AND job = ?", [(k, job) for k in keys])
+            tombstoned = conn.executemany(
+                "UPDATE entries SET deleted = 1 WHERE key = ? AND deleted = 0 "
+                "AND NOT EXISTS (SELECT 1 FROM jobs WHERE jobs.key = entries.key)",
+                [(k,) for k in keys],
+            ).rowcount
+            if tombstoned:
+                self._bump(conn)
+
+    # Reading
+
+    def _refresh(self):
+        conn = self._conn()
+        generation = self._meta(conn, "generation")
+        view = self._view
+        if view is not None and view.generation == generation:
+            return view
+        with self._view_lock:
+            if self._view is not None and self._view.generation == generation:
+                return self._view
+            entries = conn.execute("SELECT row, key, deleted, list, info FROM entries ORDER BY row").fetchall()
+            dimension = self._dimension(conn)
+            count = entries[-1][0] + 1 if entries else 0
+            keys = [None] * count
+            infos = [None] * count
+            alive = np.zeros(count, dtype=bool)
+            lists = np.full(count, -1, dtype=np.int64)
+            for row, key, deleted, cell, info in entries:
+                keys[row], infos[row], alive[row], lists[row] = key, info, not deleted, cell
+            if count:
+                matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, dimension))
+            else:
+                matrix = np.zeros((0, dimension or 0), dtype=np.float32)
+            centroids = np.load(self.centroids_path) if os.path.exists(self.centroids_path) else None
+            self._view = _View(generation, matrix, keys, infos, alive, lists, centroids)
+            return self._view
+
+    def search(self, query, top_k=10, nprobe=None):
+        """
+        Return up to ``top_k`` ``(key, similarity, info)`` tuples, best first;
+        ``info["jobIds"]`` lists the jobs the key was added for.
+        """
+        view = self._refresh()
+        if not view.alive.any():
+            return []
+        query = _normalise(query)[0]
+        nprobe = Config.VECTOR_INDEX_NPROBE if nprobe is None else nprobe
+        candidates = view.alive
+        if view.centroids is not None and 0 < nprobe < len(view.centroids):
+            probed = rank_order(view.centroids @ query, nprobe)
+            candidates = candidates & np.isin(view.lists, probed)
+        rows = np.flatnonzero(candidates)
+        scores = view.matrix[rows] @ query
+        hits = [(rows[i], float(scores[i])) for i in rank_order(scores, top_k)]
+        jobs = self._jobs([view.keys[row] for row, _ in hits])
+        return [(view.keys[row], score, dict(json.loads(view.infos[row]), jobIds=jobs.get(view.keys[row], [])))
+                for row, score in hits]
+
+    def _jobs(self, keys):
+        """``{key: [job, ...]}`` for ``keys``, read fresh so job changes need no new view"""
+        jobs = {}
+        # Batched under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            for key, job in self._conn().execute(
+                    f"SELECT key, job FROM jobs WHERE key IN ({', '.join('?' * len(batch))}) ORDER BY key, job",
+                    batch):
+                jobs.setdefault(key, []).append(job)
+        return jobs
+
+    def stats(self):
+        conn = self._conn()
+        total, deleted = conn.execute("SELECT COUNT(*), COALESCE(SUM(deleted), 0) FROM entries").fetchone()
+        centroids = np.load(self.centroids_path, mmap_mode="r") if os.path.exists(self.centroids_path) else None
+        return {
+            "entries": total - deleted,
+            "tombstones": deleted,
+            "dimension": self._dimension(conn),
+            "ivf_lists": len(centroids) if centroids is not None else 0,
+        }
+
+    # Maintenance
+
+    def build_ivf(self, nlist=None, iterations=10, sample=50000, seed=0):
+        """Cluster the live vectors with k-means and assign every row to a list"""
+        with self._write_lock() as conn:
+            rows = np.array([r for (r,) in conn.execute("SELECT row FROM entries WHERE deleted = 0")], dtype=np.int64)
+            dimension = self._dimension(conn)
+            if rows.size == 0:
+                return 0
+            matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(int(rows.max()) + 1, dimension))
+            nlist = min(nlist or max(1, int(np.sqrt(rows.size))), rows.size)
+            rng = np.random.default_rng(seed)
+            training = np.asarray(matrix[np.sort(rng.choice(rows, min(sample, rows.size), replace=False))])
+            centroids = training[rng.choice(len(training), nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assignment = np.argmax(training @ centroids.T, axis=1)
+                for cell in range(nlist):
+                    members = training[assignment == cell]
+                    if len(members):
+                        centroids[cell] = members.mean(axis=0)
+                centroids = _normalise(centroids)
+            assignment = np.concatenate([np.argmax(np.asarray(matrix[chunk]) @ centroids.T, axis=1)
+                                         for chunk in np.array_split(rows, max(1, rows.size // 10000))])
+            conn.executemany("UPDATE entries SET list = ? WHERE row = ?",
+                             [(int(c), int(r)) for c, r in zip(assignment, rows)])
+            np.save(self.centroids_path, centroids)
+            self._bump(conn)
+        logger.info(f"Built {nlist} IVF lists over {rows.size} vectors")
+        return nlist
+
+    def compact(self):
+        """Rewrite the matrix without tombstoned rows"""
+        with self._write_lock() as conn:
+            live = conn.execute("SELECT row FROM entries WHERE deleted = 0 ORDER BY row").fetchall()
+            dimension = self._dimension(conn)
+            conn.execute("DELETE FROM entries WHERE deleted = 1")
+            temporary = self.vectors_path + ".tmp"
+            if live:
+                (last,) = conn.execute("SELECT MAX(row) FROM entries").fetchone()
+                matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(last + 1, dimension))
+                with open(temporary, "wb") as f:
+                    for new_row, (old_row,) in enumerate(live):
+                        f.write(np.asarray(matrix[old_row]).tobytes())
+                # Negative rows avoid primary key clashes while renumbering
+                conn.executemany("UPDATE entries SET row = ? WHERE row = ?",
+                                 [(-new_row - 1, old_row) for new_row, (old_row,) in enumerate(live)])
+                conn.execute("UPDATE entries SET row = -row - 1")
+            else:
+                open(temporary, "wb").close()
+            self._bump(conn)
+            # Readers holding the old mapping keep the old file until they refresh
+            os.replace(temporary, self.vectors_path)
+        return len(live)
+
+    def backfill(self):
+        """Index every embedding in the feature store written by the current models"""
+        return self.add((url, embedding, digest, {"url": url})
+                        for url, digest, embedding in get_feature_store().iter_embeddings())
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_vector_index():
+    """Return the per-process vector index, or None when ``VECTOR_INDEX_DIR`` is empty"""
+    global _index
+    if _index is None and Config.VECTOR_INDEX_DIR:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex()
+    return _index
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    index = get_vector_index()
+    if index is None:
+        sys.exit("VECTOR_INDEX_DIR is not set")
+    if command == "backfill":
+        print(f"Indexed {index.backfill()} embeddings from the feature store")
+    elif command == "build-ivf":
+        print(f"Built {index.build_ivf(int(sys.argv[2]) if len(sys.argv) > 2 else None)} IVF lists")
+    elif command == "compact":
+        print(f"Compacted to {index.compact()} live vectors")
+    elif command != "stats":
+        sys.exit(f"Unknown command '{command}', expected stats, backfill, build-ivf or compact")
+    print(json.dumps(index.stats(), indent=2))